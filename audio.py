@@ -0,0 +1,177 @@
+import logging
+import threading
+import time
+import wave
+
+import numpy as np
+
+from lazy import lazy_import
+
+sd = lazy_import("sounddevice")
+
+# Streaming audio monitor
+# Audio arrives through a sounddevice.InputStream callback (or a WAV file
+# played back with the same callback signature, for tests and replays). Each
+# chunk is copied into a preallocated float32 ring buffer and split into
+# BLOCK_MS blocks whose RMS is computed in one vectorised expression. A block
+# counts as voiced when it is clearly above both VOICE_THRESHOLD and the
+# adaptive noise floor; `active` is set while at least ACTIVE_RATIO of the
+# last WINDOW_MS of blocks were voiced. Readers just look at `active`/`level`,
+# which never blocks the video loop or the event log.
+
+SAMPLE_RATE = 16000
+BLOCK_MS = 30
+WINDOW_MS = 600
+BUFFER_SECONDS = 10
+VOICE_THRESHOLD = 0.02   # RMS of a float32 signal in [-1, 1]
+NOISE_FACTOR = 3.0
+ACTIVE_RATIO = 0.3
+
+
+class WavFileSource:
+    # Plays a 16-bit PCM WAV file into the monitor's callback instead of a microphone
+    def __init__(self, path, realtime=True):
+        self.path = path
+        self.realtime = realtime
+        with wave.open(path, "rb") as wav:
+            self.samplerate = wav.getframerate()
+            channels = wav.getnchannels()
+            width = wav.getsampwidth()
+            raw = wav.readframes(wav.getnframes())
+        if width != 2:
+            raise ValueError(f"{path}: only 16-bit PCM WAV files are supported")
+        self.samples = np.frombuffer(raw, dtype="<i2").reshape(-1, channels).astype(np.float32) / 32768.0
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self, callback, blocksize):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._play, args=(self.samples, callback, blocksize),
+                                        name="wav-source", daemon=True)
+        self._thread.start()
+
+    def _play(self, samples, callback, blocksize):
+        period = blocksize / self.samplerate
+        next_time = time.monotonic()
+        for begin in range(0, len(samples), blocksize):
+            if self._stop.is_set():
+                break
+            chunk = samples[begin:begin + blocksize]
+            callback(chunk, len(chunk), None, None)
+            if self.realtime:
+                next_time += period
+                delay = next_time - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+    def wait(self):
+        if self._thread is not None:
+            self._thread.join()
+
+    def stop(self):
+        self._stop.set()
+        self.wait()
+
+
+class AudioMonitor:
+    def __init__(self, samplerate=SAMPLE_RATE, block_ms=BLOCK_MS, window_ms=WINDOW_MS,
+                 threshold=VOICE_THRESHOLD, source=None, on_change=None, device=None):
+        self.samplerate = samplerate
+        self.block_ms = block_ms
+        self.window_ms = window_ms
+        self.threshold = threshold
+        self.source = source
+        self.on_change = on_change
+        self.device = device
+        self._stream = None
+        self._configure(samplerate)
+        self.active = False
+        self.level = 0.0
+        self.noise_floor = threshold / NOISE_FACTOR
+        self.blocks = 0
+
+    def _configure(self, samplerate):
+        self.samplerate = samplerate
+        self.block_size = max(1, int(samplerate * self.block_ms / 1000))
+        self.ring = np.zeros(int(samplerate * BUFFER_SECONDS), dtype=np.float32)
+        self._ring_pos = 0
+        self._carry = np.zeros(self.block_size, dtype=np.float32)
+        self._carry_len = 0
+        self.window = np.zeros(max(1, self.window_ms // self.block_ms), dtype=bool)
+        self._window_pos = 0
+
+    def start(self):
+        if self.source is not None:
+            if self.source.samplerate != self.samplerate:
+                self._configure(self.source.samplerate)
+            self.source.start(self._callback, self.block_size)
+            return
+        self._stream = sd.InputStream(samplerate=self.samplerate, blocksize=self.block_size, channels=1,
+                                      dtype="float32", device=self.device, callback=self._callback)
+        self._stream.start()
+
+    def stop(self):
+        if self.source is not None:
+            self.source.stop()
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    def _callback(self, indata, frames, time_info, status):
+        if status:
+            logging.debug(f"Audio stream status: {status}")
+        mono = indata[:, 0] if indata.ndim > 1 else indata
+        self._write_ring(mono)
+
+        # Join with the tail of the previous chunk, then cut into whole blocks
+        if self._carry_len:
+            mono = np.concatenate([self._carry[:self._carry_len], mono])
+        full = len(mono) // self.block_size * self.block_size
+        rest = len(mono) - full
+        self._carry[:rest] = mono[full:]
+        self._carry_len = rest
+        if full:
+            self._process_blocks(mono[:full].reshape(-1, self.block_size))
+
+    def _write_ring(self, samples):
+        size = len(self.ring)
+        samples = samples[-size:]
+        end = self._ring_pos + len(samples)
+        if end <= size:
+            self.ring[self._ring_pos:end] = samples
+        else:
+            split = size - self._ring_pos
+            self.ring[self._ring_pos:] = samples[:split]
+            self.ring[:end - size] = samples[split:]
+        self._ring_pos = end % size
+
+    def _process_blocks(self, blocks):
+        rms = np.sqrt(np.mean(np.square(blocks), axis=1))
+        voiced = rms > np.maximum(self.threshold, self.noise_floor * NOISE_FACTOR)
+
+        # Noise floor follows quiet blocks slowly and drops quickly
+        quiet = rms[~voiced]
+        if len(quiet):
+            floor = float(quiet.min())
+            self.noise_floor = floor if floor < self.noise_floor else 0.95 * self.noise_floor + 0.05 * floor
+
+        for value in voiced[-len(self.window):]:
+            self.window[self._window_pos] = value
+            self._window_pos = (self._window_pos + 1) % len(self.window)
+        self.blocks += len(rms)
+        self.level = float(rms[-1])
+
+        active = bool(self.window.mean() >= ACTIVE_RATIO)
+        if active != self.active:
+            self.active = active
+            if self.on_change is not None:
+                self.on_change(active, self.level)
+
+    def is_active(self):
+        return self.active
+
+    def recent(self, seconds):
+        # Copy of the last `seconds` of audio from the ring buffer
+        count = min(len(self.ring), int(seconds * self.samplerate))
+        return np.roll(self.ring, -self._ring_pos)[-count:]
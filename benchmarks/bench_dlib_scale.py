@@ -0,0 +1,62 @@
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import functionKM
+from detectors import DlibDetector
+
+# Detection fps of dlib HOG face detection (DlibDetector.find_faces) at full
+# resolution against the downscaled mode, on the same frames.
+# Usage: python benchmarks/bench_dlib_scale.py --video exam.avi --scale 0.5
+
+
+def read_frames(source, count):
+    cap = cv2.VideoCapture(source)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def measure(frames, scale, upsample):
+    detector = DlibDetector(scale, upsample)
+    detector.warm_up()
+    faces = 0
+    start = time.perf_counter()
+    for frame in frames:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        faces += len(detector.find_faces(gray))
+    elapsed = time.perf_counter() - start
+    return len(frames) / elapsed if elapsed else 0.0, faces
+
+
+def main():
+    parser = argparse.ArgumentParser(description="dlib HOG detection fps by scale")
+    parser.add_argument("--video", default="0", help="video file or camera index")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--scale", type=float, default=functionKM.DETECT_SCALE)
+    parser.add_argument("--upsample", type=int, default=functionKM.DETECT_UPSAMPLE)
+    args = parser.parse_args()
+    source = int(args.video) if args.video.isdigit() else args.video
+
+    frames = read_frames(source, args.frames)
+    if not frames:
+        print("No frames read")
+        return
+    height, width = frames[0].shape[:2]
+    print(f"{len(frames)} frames at {width}x{height}")
+    for scale in (1.0, args.scale):
+        fps, faces = measure(frames, scale, args.upsample)
+        print(f"scale {scale:4.2f} upsample {args.upsample}: {fps:6.1f} fps  faces={faces}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.spatial import distance
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from landmarks import stack_landmarks, eye_features
+
+# Per-frame cost of the eye metrics: the old list-of-tuples + scipy path
+# against the batched NumPy path, on synthetic dlib-like landmark shapes.
+# Usage: python benchmarks/bench_ear.py --faces 4 --frames 2000
+
+
+class Point:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class Shape:
+    # Mimics dlib.full_object_detection: part(i) and parts()
+    def __init__(self, points):
+        self._points = [Point(int(x), int(y)) for x, y in points]
+
+    def part(self, i):
+        return self._points[i]
+
+    def parts(self):
+        return self._points
+
+
+def scipy_ear(eye):
+    A = distance.euclidean(eye[1], eye[5])
+    B = distance.euclidean(eye[2], eye[4])
+    C = distance.euclidean(eye[0], eye[3])
+    return (A + B) / (2.0 * C)
+
+
+def legacy_frame(shapes):
+    ears = []
+    for landmarks in shapes:
+        left_eye = [(landmarks.part(i).x, landmarks.part(i).y) for i in range(36, 42)]
+        right_eye = [(landmarks.part(i).x, landmarks.part(i).y) for i in range(42, 48)]
+        ears.append((scipy_ear(left_eye) + scipy_ear(right_eye)) / 2.0)
+    return ears
+
+
+def vectorized_frame(shapes):
+    return eye_features(stack_landmarks(shapes))["ear"]
+
+
+def time_per_frame(func, frames):
+    start = time.perf_counter()
+    for shapes in frames:
+        func(shapes)
+    return (time.perf_counter() - start) / len(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EAR computation micro-benchmark")
+    parser.add_argument("--faces", type=int, default=1)
+    parser.add_argument("--frames", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frames = [[Shape(rng.integers(0, 640, size=(68, 2))) for _ in range(args.faces)]
+              for _ in range(args.frames)]
+
+    assert np.allclose(legacy_frame(frames[0]), vectorized_frame(frames[0]), rtol=1e-4)
+    legacy = time_per_frame(legacy_frame, frames)
+    vectorized = time_per_frame(vectorized_frame, frames)
+    print(f"faces/frame: {args.faces}")
+    print(f"scipy per-point : {legacy * 1e6:8.1f} us/frame")
+    print(f"numpy batched   : {vectorized * 1e6:8.1f} us/frame  ({legacy / vectorized:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tracking import FaceTracker, DETECT_EVERY
+
+# Compares the per-frame Haar path with detect-then-track on the same input.
+# Usage: python benchmarks/bench_tracking.py --video recording.avi --frames 300
+
+
+def run(source, frames, detect_every):
+    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_eye.xml")
+    detect = lambda gray: face_cascade.detectMultiScale(gray, 1.3, 5)
+    tracker = FaceTracker(detect, detect_every) if detect_every > 1 else None
+
+    cap = cv2.VideoCapture(source)
+    processed = 0
+    faces_total = 0
+    eyes_total = 0
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    while processed < frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        faces = tracker.update(frame, gray) if tracker is not None else detect(gray)
+        for (x, y, w, h) in faces:
+            eyes_total += len(eye_cascade.detectMultiScale(gray[y:y + h, x:x + w], 1.1, 10))
+        faces_total += len(faces)
+        processed += 1
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    cap.release()
+
+    return {
+        "frames": processed,
+        "fps": processed / wall if wall else 0.0,
+        "cpu_percent": 100.0 * cpu / wall if wall else 0.0,
+        "faces": faces_total,
+        "eyes": eyes_total,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Haar per-frame vs detect-then-track benchmark")
+    parser.add_argument("--video", default="0", help="video file or camera index")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--detect-every", type=int, default=DETECT_EVERY)
+    args = parser.parse_args()
+    source = int(args.video) if args.video.isdigit() else args.video
+
+    for name, every in (("haar (every frame)", 1), (f"track (detect every {args.detect_every})", args.detect_every)):
+        result = run(source, args.frames, every)
+        print(f"{name:32s} {result['frames']:5d} frames  {result['fps']:7.1f} fps  "
+              f"{result['cpu_percent']:6.1f}% CPU  faces={result['faces']} eyes={result['eyes']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import queue
+import resource
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tracking import FaceTracker, DETECT_EVERY
+from detectors import create_detector, HaarDetector
+
+# Offline detection benchmark
+# Replays a recorded video (or seeded synthetic frames) through the detection
+# paths headlessly and writes one JSON document with fps, per-frame latency
+# percentiles, peak RSS and detection counts per path. Each path runs in its
+# own process so peak RSS is not shared between them.
+# Usage:
+#   python benchmarks/run_benchmarks.py --video exam.avi --frames 500 --output bench.json
+#   python benchmarks/run_benchmarks.py --synthetic 300 --paths haar haar_tracked
+
+PATHS = ["haar", "haar_tracked", "dlib", "cascade"]
+
+
+def load_frames(video, count):
+    cap = cv2.VideoCapture(video)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def synthetic_frames(count, width=640, height=480, seed=0):
+    # Noise plus a moving bright ellipse; stable across runs for a given seed
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i in range(count):
+        frame = rng.integers(0, 64, size=(height, width, 3), dtype=np.uint8)
+        center = (width // 4 + (i * 3) % (width // 2), height // 2)
+        cv2.ellipse(frame, center, (60, 80), 0, 0, 360, (180, 170, 160), -1)
+        frames.append(frame)
+    return frames
+
+
+def make_detector(path):
+    if path == "haar_tracked":
+        detector = HaarDetector()
+        detector.tracker = FaceTracker(detector.find_faces, DETECT_EVERY)
+    elif path in PATHS:
+        detector = create_detector(path)
+    else:
+        raise ValueError(f"Unknown path {path}")
+    # Models are loaded here so the first frame's latency does not include them
+    detector.warm_up()
+    return lambda frame: detector.detect([frame])[0]
+
+
+def run_path(path, frames, results):
+    detect = make_detector(path)
+    latencies = np.empty(len(frames))
+    faces = eyes = frames_with_face = 0
+    start = time.perf_counter()
+    for i, frame in enumerate(frames):
+        t = time.perf_counter()
+        result = detect(frame)
+        latencies[i] = time.perf_counter() - t
+        faces += len(result["faces"])
+        eyes += len(result.get("eyes", []))
+        frames_with_face += bool(result["faces"])
+    elapsed = time.perf_counter() - start
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1000 if len(frames) else (0, 0, 0)
+    results.put({
+        "path": path,
+        "frames": len(frames),
+        "fps": len(frames) / elapsed if elapsed else 0.0,
+        "latency_ms": {"p50": p50, "p90": p90, "p99": p99, "max": latencies.max() * 1000 if len(frames) else 0},
+        # ru_maxrss is KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "detections": {"faces": faces, "eyes": eyes, "frames_with_face": frames_with_face},
+    })
+
+
+def code_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless detection benchmark")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--video", help="recorded video file to replay")
+    group.add_argument("--synthetic", type=int, metavar="N", help="use N synthetic frames")
+    parser.add_argument("--frames", type=int, default=300, help="max frames read from --video")
+    parser.add_argument("--paths", nargs="+", default=PATHS, choices=PATHS)
+    parser.add_argument("--output", help="JSON file to write (default: stdout)")
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames) if args.video else synthetic_frames(args.synthetic)
+    if not frames:
+        print("No frames to benchmark")
+        sys.exit(1)
+
+    results = {}
+    results_queue = mp.Queue()
+    for path in args.paths:
+        worker = mp.Process(target=run_path, args=(path, frames, results_queue))
+        worker.start()
+        result = None
+        while result is None:
+            try:
+                result = results_queue.get(timeout=1)
+            except queue.Empty:
+                if not worker.is_alive():
+                    result = {"path": path, "error": f"exit code {worker.exitcode}"}
+        worker.join()
+        results[path] = result
+
+    report = {
+        "version": code_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "input": args.video or f"synthetic:{args.synthetic}",
+        "frame_size": list(frames[0].shape[1::-1]),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, default=float)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import threading
+import time
+import logging
+from lazy import lazy_import
+
+cv2 = lazy_import("cv2")
+
+# Shared camera capture
+# One FrameSource owns a device and keeps the latest frames in a small ring
+# buffer. Consumers (video loop, recorder, detectors, snapshot writer) acquire
+# a reference to a slot instead of opening the device themselves; a slot is
+# only reused by the capture thread once every reference to it is released.
+
+DEFAULT_SLOTS = 4
+
+
+class FrameRef:
+    def __init__(self, source, slot, frame, seq, timestamp):
+        self._source = source
+        self._slot = slot
+        self.frame = frame
+        self.seq = seq
+        self.timestamp = timestamp
+
+    def release(self):
+        if self._source is not None:
+            self._source._release(self._slot)
+            self._source = None
+            self.frame = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class FrameSource:
+    def __init__(self, index=0, width=None, height=None, slots=DEFAULT_SLOTS):
+        self.index = index
+        self.width = width
+        self.height = height
+        self._frames = [None] * slots
+        self._seqs = [-1] * slots
+        self._stamps = [0.0] * slots
+        self._refs = [0] * slots
+        self._latest = -1
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._cap = None
+        self._thread = None
+        self._running = False
+        self.users = 0  # callers of open_frame_source holding it
+        self.frames_captured = 0
+        self.frames_dropped = 0
+
+    def start(self):
+        if self._running:
+            return True
+        self._cap = cv2.VideoCapture(self.index)
+        if self.width:
+            self._cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        if self.height:
+            self._cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        if not self._cap.isOpened():
+            self._cap.release()
+            self._cap = None
+            return False
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"camera-{self.index}", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self._thread = None
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+    def is_running(self):
+        return self._running
+
+    def _free_slot(self):
+        # Next slot after the latest one that no consumer is holding. The
+        # latest slot itself is never reused, so acquire() cannot race a write.
+        count = len(self._frames)
+        for step in range(1, count):
+            slot = (self._latest + step) % count
+            if self._refs[slot] == 0:
+                return slot
+        return None
+
+    def _run(self):
+        failures = 0
+        while self._running:
+            with self._cond:
+                slot = self._free_slot()
+            if slot is None:
+                # Every slot is held by a slow consumer; drop this frame
+                self._cap.grab()
+                self.frames_dropped += 1
+                continue
+
+            # Read straight into the slot's buffer so steady state does not allocate
+            ret, frame = self._cap.read(self._frames[slot])
+            if not ret:
+                failures += 1
+                if failures > 30:
+                    logging.error(f"Camera {self.index} stopped delivering frames")
+                    break
+                time.sleep(0.01)
+                continue
+            failures = 0
+
+            with self._cond:
+                self._frames[slot] = frame
+                self._seqs[slot] = self._seq
+                self._stamps[slot] = time.time()
+                self._latest = slot
+                self._seq += 1
+                self.frames_captured += 1
+                self._cond.notify_all()
+
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def acquire(self, after_seq=-1, timeout=1.0):
+        # Wait for a frame newer than after_seq and pin its slot
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._latest < 0 or self._seqs[self._latest] <= after_seq:
+                remaining = deadline - time.monotonic()
+                if not self._running or remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            slot = self._latest
+            self._refs[slot] += 1
+            return FrameRef(self, slot, self._frames[slot], self._seqs[slot], self._stamps[slot])
+
+    def _release(self, slot):
+        with self._cond:
+            self._refs[slot] -= 1
+
+    def snapshot(self, timeout=1.0):
+        # Copy of the latest frame, or None if nothing was captured yet
+        ref = self.acquire(timeout=timeout)
+        if ref is None:
+            return None
+        with ref:
+            return ref.frame.copy()
+
+
+_sources = {}
+_sources_lock = threading.Lock()
+
+
+def open_frame_source(index=0, width=None, height=None, slots=DEFAULT_SLOTS):
+    # Shared per device: the first caller opens it, later callers reuse it.
+    # Each caller must pass the returned source to close_frame_source().
+    with _sources_lock:
+        source = _sources.get(index)
+        if source is not None and not source.is_running():
+            # The capture thread died; release the device before reopening it.
+            # Holders of the dead source still close it, which only forgets it.
+            source.stop()
+            source = None
+        if source is None:
+            source = FrameSource(index, width, height, slots)
+            if not source.start():
+                _sources.pop(index, None)
+                return None
+            _sources[index] = source
+        source.users += 1
+        return source
+
+
+def close_frame_source(source):
+    # Reference counted on the source itself, so closing a replaced source
+    # never stops its successor. Stopped under the lock, so a concurrent
+    # open_frame_source cannot reopen the device while it is still held.
+    if source is None:
+        return
+    with _sources_lock:
+        source.users -= 1
+        if source.users > 0:
+            return
+        if _sources.get(source.index) is source:
+            del _sources[source.index]
+        source.stop()
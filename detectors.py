@@ -0,0 +1,197 @@
+from lazy import lazy_import, LazyResource
+from metrics import stage_timer
+
+cv2 = lazy_import("cv2")
+dlib = lazy_import("dlib")
+landmarks = lazy_import("landmarks")
+
+# Detector interface
+# The Haar (faces + eyes, "looking away") and dlib (HOG + 68 landmarks, EAR)
+# engines share one batched call:
+#   detector.detect(frames, grays=None, faces=None) -> one result dict per frame
+# grays lets stages that run on the same frames share one grayscale
+# conversion, and faces gives per-frame (x, y, w, h) regions that were already
+# found, so a detector only works inside them. Results are plain lists and
+# ints (they also travel back from the worker processes in workers.py):
+#   haar:    faces, eyes, looking_out
+#   dlib:    faces, ear, closed, gaze_offset
+#   cascade: all of the above. Cheap Haar gating runs first and dlib landmarks
+#            only run on the frames, and inside the face regions, Haar found.
+# Models are loaded once per process on first use and shared by every detector.
+
+HAAR_FACE = "haarcascade_frontalface_default.xml"
+HAAR_EYE = "haarcascade_eye.xml"
+PREDICTOR_PATH = "shape_predictor_68_face_landmarks.dat"
+
+# dlib HOG runs on a copy scaled by DLIB_SCALE (1.0 = full frame); rectangles
+# are mapped back to full resolution for the landmark predictor. 0.5 is the
+# setting measured by benchmarks/bench_dlib_scale.py.
+DLIB_SCALE = 0.5
+DLIB_UPSAMPLE = 0
+
+
+def _load_haar():
+    return {
+        "face": cv2.CascadeClassifier(cv2.data.haarcascades + HAAR_FACE),
+        "eye": cv2.CascadeClassifier(cv2.data.haarcascades + HAAR_EYE),
+    }
+
+
+def _load_dlib():
+    return {
+        "detector": dlib.get_frontal_face_detector(),
+        "predictor": dlib.shape_predictor(PREDICTOR_PATH),
+    }
+
+
+haar_models = LazyResource("haar cascades", _load_haar)
+dlib_models = LazyResource("dlib models", _load_dlib)
+
+
+def to_gray(frames):
+    with stage_timer("gray"):
+        return [cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) for frame in frames]
+
+
+class Detector:
+    kind = None
+
+    def warm_up(self):
+        pass
+
+    def detect(self, frames, grays=None, faces=None):
+        raise NotImplementedError
+
+
+class HaarDetector(Detector):
+    kind = "haar"
+
+    def __init__(self, scale_factor=1.3, min_neighbors=5, tracker=None):
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        # Optional tracking.FaceTracker; stateful, so one per stream
+        self.tracker = tracker
+
+    def warm_up(self):
+        haar_models.get()
+
+    def find_faces(self, gray):
+        return haar_models.get()["face"].detectMultiScale(gray, self.scale_factor, self.min_neighbors)
+
+    def detect(self, frames, grays=None, faces=None):
+        grays = grays or to_gray(frames)
+        eye_cascade = haar_models.get()["eye"]
+        results = []
+        for i, (frame, gray) in enumerate(zip(frames, grays)):
+            if faces is not None:
+                found = faces[i]
+            else:
+                with stage_timer("face_detect"):
+                    found = self.tracker.update(frame, gray) if self.tracker else self.find_faces(gray)
+            eyes_found = []
+            looking_out = 0
+            for (x, y, w, h) in found:
+                with stage_timer("eye_detect"):
+                    eyes = eye_cascade.detectMultiScale(gray[y:y + h, x:x + w], 1.1, 10)
+                if len(eyes) < 2:
+                    looking_out += 1
+                eyes_found.extend((int(x + ex), int(y + ey), int(ew), int(eh)) for (ex, ey, ew, eh) in eyes)
+            results.append({
+                "faces": [tuple(int(v) for v in face) for face in found],
+                "eyes": eyes_found,
+                "looking_out": looking_out,
+            })
+        return results
+
+
+class DlibDetector(Detector):
+    kind = "dlib"
+
+    def __init__(self, scale=DLIB_SCALE, upsample=DLIB_UPSAMPLE, ear_threshold=None):
+        self.scale = scale
+        self.upsample = upsample
+        self.ear_threshold = ear_threshold
+
+    def warm_up(self):
+        dlib_models.get()
+
+    def find_faces(self, gray):
+        detector = dlib_models.get()["detector"]
+        if self.scale == 1.0:
+            return list(detector(gray, self.upsample))
+        small = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return [dlib.rectangle(int(r.left() / self.scale), int(r.top() / self.scale),
+                               int(r.right() / self.scale), int(r.bottom() / self.scale))
+                for r in detector(small, self.upsample)]
+
+    def detect(self, frames, grays=None, faces=None):
+        grays = grays or to_gray(frames)
+        predictor = dlib_models.get()["predictor"]
+        rects = []
+        for i, gray in enumerate(grays):
+            if faces is not None:
+                rects.append([dlib.rectangle(int(x), int(y), int(x + w - 1), int(y + h - 1))
+                              for (x, y, w, h) in faces[i]])
+            else:
+                with stage_timer("face_detect"):
+                    rects.append(self.find_faces(gray))
+
+        # Landmarks of every face in the batch go through one vectorised EAR pass
+        with stage_timer("landmarks"):
+            shapes = [predictor(gray, rect) for gray, frame_rects in zip(grays, rects) for rect in frame_rects]
+            stacked = landmarks.stack_landmarks(shapes)
+        if self.ear_threshold is None:
+            features = landmarks.eye_features(stacked)
+        else:
+            features = landmarks.eye_features(stacked, self.ear_threshold)
+
+        results = []
+        start = 0
+        for frame_rects in rects:
+            end = start + len(frame_rects)
+            results.append({
+                "faces": [(r.left(), r.top(), r.width(), r.height()) for r in frame_rects],
+                "ear": features["ear"][start:end].tolist(),
+                "closed": features["closed"][start:end].tolist(),
+                "gaze_offset": features["gaze_offset"][start:end].tolist(),
+            })
+            start = end
+        return results
+
+
+class CascadeDetector(Detector):
+    kind = "cascade"
+
+    def __init__(self, gate=None, refine=None):
+        self.gate = gate or HaarDetector()
+        self.refine = refine or DlibDetector()
+        self.frames = 0
+        self.refined = 0
+
+    def warm_up(self):
+        self.gate.warm_up()
+        self.refine.warm_up()
+
+    def detect(self, frames, grays=None, faces=None):
+        grays = grays or to_gray(frames)
+        results = self.gate.detect(frames, grays, faces)
+        hits = [i for i, result in enumerate(results) if result["faces"]]
+        self.frames += len(frames)
+        self.refined += len(hits)
+        for result in results:
+            result.update(ear=[], closed=[], gaze_offset=[])
+        if hits:
+            refined = self.refine.detect([frames[i] for i in hits], [grays[i] for i in hits],
+                                         [results[i]["faces"] for i in hits])
+            for i, extra in zip(hits, refined):
+                results[i].update(ear=extra["ear"], closed=extra["closed"], gaze_offset=extra["gaze_offset"])
+        return results
+
+
+DETECTORS = {"haar": HaarDetector, "dlib": DlibDetector, "cascade": CascadeDetector}
+
+
+def create_detector(kind, **options):
+    if kind not in DETECTORS:
+        raise ValueError(f"Unknown detector {kind}")
+    return DETECTORS[kind](**options)
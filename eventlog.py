@@ -0,0 +1,189 @@
+import atexit
+import os
+import queue
+import threading
+import time
+
+# Buffered activity log
+# Callers (pynput listeners, snapshot thread) only push (timestamp, text) onto
+# a queue. A single background writer keeps the file open, formats the lines
+# and writes them in batches, flushing when BATCH_SIZE lines are pending or
+# FLUSH_INTERVAL seconds have passed. When the stop event is set, everything
+# pending is written and fsync'ed to disk.
+
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 1.0
+
+
+class ActivityLog:
+    def __init__(self, path, stop_event=None, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.stop_event = stop_event
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._closed = threading.Event()
+        self._start_lock = threading.Lock()
+        self._stamp_second = None
+        self._stamp_text = ""
+        atexit.register(self.close)
+
+    def log(self, text):
+        self._queue.put((time.time(), text))
+        if self._thread is None:
+            self._start()
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._closed.clear()
+            self._thread = threading.Thread(target=self._run, name=f"log-{self.path}", daemon=True)
+            self._thread.start()
+
+    def _format(self, ts, text):
+        # Lines arrive in bursts within the same second; format each second once
+        second = int(ts)
+        if second != self._stamp_second:
+            self._stamp_second = second
+            self._stamp_text = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+        return f"[{self._stamp_text}] {text}\n"
+
+    def _run(self):
+        batch = []
+        synced = False
+        last_flush = time.monotonic()
+        with open(self.path, "a", encoding="utf-8") as file:
+            while True:
+                closing = self._closed.is_set()
+                stopping = self.stop_event is not None and self.stop_event.is_set()
+                if closing or (stopping and not synced):
+                    # Durable flush: write everything queued so far and fsync
+                    while True:
+                        try:
+                            ts, text = self._queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        batch.append(self._format(ts, text))
+                    file.write("".join(batch))
+                    file.flush()
+                    os.fsync(file.fileno())
+                    batch.clear()
+                    synced = True
+                    last_flush = time.monotonic()
+                    if closing:
+                        break
+                    continue
+                if not stopping:
+                    synced = False
+
+                remaining = self.flush_interval - (time.monotonic() - last_flush)
+                try:
+                    ts, text = self._queue.get(timeout=min(0.2, max(0.01, remaining)))
+                    batch.append(self._format(ts, text))
+                except queue.Empty:
+                    pass
+
+                if batch and (len(batch) >= self.batch_size
+                              or time.monotonic() - last_flush >= self.flush_interval):
+                    file.write("".join(batch))
+                    file.flush()
+                    batch.clear()
+                    last_flush = time.monotonic()
+
+    def close(self, timeout=5):
+        with self._start_lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._closed.set()
+            thread.join(timeout=timeout)
+            self._thread = None
+        if not self._queue.empty():
+            self._start()
+
+
+_logs = {}
+_logs_lock = threading.Lock()
+
+
+def get_activity_log(path="activity_log.txt", stop_event=None):
+    # One writer per file, shared by every module that logs to it
+    with _logs_lock:
+        log = _logs.get(path)
+        if log is None:
+            log = ActivityLog(path, stop_event)
+            _logs[path] = log
+        elif stop_event is not None and log.stop_event is None:
+            log.stop_event = stop_event
+        return log
+
+
+def close_activity_log(path):
+    # Write out and forget a log nobody will use again (e.g. a finished session)
+    with _logs_lock:
+        log = _logs.pop(path, None)
+    if log is not None:
+        log.close()
+        atexit.unregister(log.close)
+
+
+# Detection event buffer
+# add() coalesces repeats of the same text into one run while they keep
+# arriving within COALESCE_GAP seconds, so per-frame events like
+# "Face detected" become "Face detected ×120 (12:00:01–12:00:07)". Runs live in
+# a bounded list; take() swaps it with a spare list under the lock, so the
+# writer formats and writes one buffer while producers fill the other.
+
+EVENT_CAPACITY = 10000
+COALESCE_GAP = 1.0
+
+
+class EventBuffer:
+    def __init__(self, capacity=EVENT_CAPACITY, coalesce_gap=COALESCE_GAP):
+        self.capacity = capacity
+        self.coalesce_gap = coalesce_gap
+        self._lock = threading.Lock()
+        self._active = []
+        self._spare = []
+        self._open_runs = {}
+        self.dropped = 0
+
+    def add(self, text, ts=None):
+        if ts is None:
+            ts = time.time()
+        with self._lock:
+            run = self._open_runs.get(text)
+            if run is not None and ts - run[3] <= self.coalesce_gap:
+                run[1] += 1
+                run[3] = ts
+                return
+            if len(self._active) >= self.capacity:
+                self.dropped += 1
+                return
+            run = [text, 1, ts, ts]
+            self._active.append(run)
+            self._open_runs[text] = run
+
+    def pending(self):
+        return len(self._active)
+
+    def take(self):
+        # Returns (runs, dropped); the caller must be done with runs before the next take()
+        with self._lock:
+            self._spare.clear()
+            self._active, self._spare = self._spare, self._active
+            self._open_runs = {}
+            dropped, self.dropped = self.dropped, 0
+        return self._spare, dropped
+
+
+def format_run(run):
+    text, count, first, last = run
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(first))
+    if count == 1:
+        return f"[{stamp}] {text}"
+    start = time.strftime("%H:%M:%S", time.localtime(first))
+    end = time.strftime("%H:%M:%S", time.localtime(last))
+    return f"[{stamp}] {text} ×{count} ({start}–{end})"
@@ -0,0 +1,260 @@
+import argparse
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# Session event store
+# All sessions write their events into one SQLite database in WAL mode, so
+# readers (queries, the UI, offline analysis) never block the writer. add()
+# only queues the row; a background thread inserts queued rows in one
+# transaction per batch, every BATCH_SIZE rows or FLUSH_INTERVAL seconds.
+# Rows are indexed by (session, ts) and (kind, ts), so "what happened in
+# session X between minute 12 and 14" is an index range scan.
+# Usage:
+#   python eventstore.py sessions/events.db --sessions
+#   python eventstore.py sessions/events.db --session S --minutes 12 14 --kind alert
+
+DB_PATH = "events.db"
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL,
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    message TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 1,
+    last_ts REAL,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS events_session_ts ON events (session, ts);
+CREATE INDEX IF NOT EXISTS events_kind_ts ON events (kind, ts);
+"""
+
+COLUMNS = ("id", "session", "ts", "kind", "message", "count", "last_ts", "data")
+_FLUSH = object()
+
+
+def connect(path):
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class EventStore:
+    def __init__(self, path=DB_PATH, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with connect(path) as conn:
+            conn.executescript(SCHEMA)
+        conn.close()
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._local = threading.local()
+        self.inserted = 0
+        atexit.register(self.close)
+
+    # Writing
+
+    def add(self, session, kind, message, ts=None, count=1, last_ts=None, data=None):
+        if data is not None:
+            data = json.dumps(data, default=str)
+        self._queue.put((session, ts or time.time(), kind, message, count, last_ts, data))
+        if self._thread is None:
+            self._start()
+
+    def flush(self, timeout=5):
+        # Blocks until everything queued so far is committed
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        done.wait(timeout)
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name=f"store-{self.path}", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        conn = connect(self.path)
+        batch = []
+        waiters = []
+        last_flush = time.monotonic()
+        closing = False
+        while not closing:
+            remaining = self.flush_interval - (time.monotonic() - last_flush)
+            try:
+                item = self._queue.get(timeout=max(0.01, remaining))
+                if item is None:
+                    closing = True
+                elif item[0] is _FLUSH:
+                    waiters.append(item[1])
+                else:
+                    batch.append(item)
+            except queue.Empty:
+                pass
+            if (waiters or closing or len(batch) >= self.batch_size
+                    or time.monotonic() - last_flush >= self.flush_interval):
+                if batch:
+                    with conn:
+                        conn.executemany("INSERT INTO events (session, ts, kind, message, count, last_ts, data) "
+                                         "VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+                    self.inserted += len(batch)
+                    batch = []
+                for done in waiters:
+                    done.set()
+                waiters = []
+                last_flush = time.monotonic()
+        conn.close()
+
+    def close(self, timeout=5):
+        with self._start_lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._queue.put(None)
+            thread.join(timeout=timeout)
+            self._thread = None
+        if not self._queue.empty():
+            self._start()
+
+    def delete_session(self, session):
+        # Used when a session's files are removed by retention or quota
+        self.flush()
+        with self._reader() as conn:
+            conn.execute("DELETE FROM events WHERE session = ?", (session,))
+
+    # Reading (each thread gets its own connection)
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    def query(self, session=None, start=None, end=None, kinds=None, contains=None, limit=None):
+        # Events ordered by time; start/end are epoch seconds, kinds a list
+        where, args = [], []
+        if session is not None:
+            where.append("session = ?")
+            args.append(session)
+        if start is not None:
+            where.append("ts >= ?")
+            args.append(start)
+        if end is not None:
+            where.append("ts < ?")
+            args.append(end)
+        if kinds:
+            where.append(f"kind IN ({','.join('?' * len(kinds))})")
+            args.extend(kinds)
+        if contains:
+            where.append("message LIKE ?")
+            args.append(f"%{contains}%")
+        sql = f"SELECT {', '.join(COLUMNS)} FROM events"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts, id"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        rows = []
+        for row in self._reader().execute(sql, args):
+            event = dict(zip(COLUMNS, row))
+            if event["data"] is not None:
+                event["data"] = json.loads(event["data"])
+            rows.append(event)
+        return rows
+
+    def session_window(self, session, from_minute=None, to_minute=None, kinds=None):
+        # Events between two offsets (minutes) from the session's first event
+        first = self.session_start(session)
+        if first is None:
+            return []
+        start = first + from_minute * 60 if from_minute is not None else None
+        end = first + to_minute * 60 if to_minute is not None else None
+        return self.query(session, start, end, kinds)
+
+    def session_start(self, session):
+        row = self._reader().execute("SELECT MIN(ts) FROM events WHERE session = ?", (session,)).fetchone()
+        return row[0]
+
+    def sessions(self):
+        # [(session, first ts, last ts, number of events)]
+        return self._reader().execute(
+            "SELECT session, MIN(ts), MAX(ts), COUNT(*) FROM events GROUP BY session ORDER BY MIN(ts)").fetchall()
+
+    def counts(self, session=None):
+        # {kind: summed event count}
+        sql = "SELECT kind, SUM(count) FROM events"
+        args = ()
+        if session is not None:
+            sql += " WHERE session = ?"
+            args = (session,)
+        return dict(self._reader().execute(sql + " GROUP BY kind", args).fetchall())
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_event_store(path=DB_PATH):
+    # One writer per database, shared by every session in the process
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = EventStore(path)
+            _stores[path] = store
+        return store
+
+
+def format_event(event):
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(event["ts"]))
+    text = f"[{stamp}] {event['kind']}: {event['message']}"
+    if event["count"] > 1:
+        text += f" ×{event['count']}"
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the session event store")
+    parser.add_argument("db", nargs="?", default=DB_PATH)
+    parser.add_argument("--sessions", action="store_true", help="list sessions")
+    parser.add_argument("--session")
+    parser.add_argument("--minutes", nargs=2, type=float, metavar=("FROM", "TO"),
+                        help="minutes from the session start (needs --session)")
+    parser.add_argument("--kind", action="append", help="event kind (repeatable)")
+    parser.add_argument("--contains", help="substring of the message")
+    parser.add_argument("--limit", type=int)
+    args = parser.parse_args()
+
+    store = EventStore(args.db)
+    if args.sessions:
+        for session, first, last, count in store.sessions():
+            print(f"{session}  {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(first))}  "
+                  f"{(last - first) / 60:.1f} min  {count} events")
+        return
+    if args.minutes and args.session:
+        events = store.session_window(args.session, args.minutes[0], args.minutes[1], args.kind)
+    else:
+        events = store.query(args.session, kinds=args.kind, contains=args.contains, limit=args.limit)
+    for event in events:
+        print(format_event(event))
+
+
+if __name__ == "__main__":
+    main()
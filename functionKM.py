@@ -1,124 +1,208 @@
-import cv2
-import dlib
+import os
+import signal
 import threading
 import time
-from pynput import keyboard, mouse
-import numpy as np
-from scipy.spatial import distance
-
-# Dlib face detector and landmark predictor
-detector = dlib.get_frontal_face_detector()
-predictor = dlib.shape_predictor('shape_predictor_68_face_landmarks.dat')
-
-# Eye aspect ratio calculation
-def eye_aspect_ratio(eye):
-    A = distance.euclidean(eye[1], eye[5])
-    B = distance.euclidean(eye[2], eye[4])
-    C = distance.euclidean(eye[0], eye[3])
-    return (A + B) / (2.0 * C)
-
-# Camera setup
-cap = cv2.VideoCapture(0)
-
-# Warning thresholds
-EAR_THRESHOLD = 0.25
+from lazy import lazy_import, LazyResource, warm_up as warm_up_items
+from camera import open_frame_source, close_frame_source
+from telemetry import get_input_recorder
+from eventstore import get_event_store
+from snapshots import MotionSnapshotter
+from supervisor import Supervisor
+from scoring import ScoringEngine
+from landmarks import EAR_THRESHOLD
+from detectors import DlibDetector, CascadeDetector, dlib_models, haar_models
+from session import headless_default, event_db_path, SESSIONS_DIR
+from storage import get_storage, MAINTENANCE_INTERVAL
+
+cv2 = lazy_import("cv2")
+dlib = lazy_import("dlib")
+keyboard = lazy_import("pynput.keyboard")
+mouse = lazy_import("pynput.mouse")
+
+# Camera setup: the device is shared through camera.open_frame_source
+CAMERA_INDEX = 0
+
+# Headless mode: no window and no drawing; stop through stop_flag.
+# Same default as session.py: on when there is no display (or EXAM_HEADLESS=1).
+HEADLESS = headless_default()
+
+# Warning thresholds (EAR_THRESHOLD comes from landmarks.py)
 FRAME_COUNT_THRESHOLD = 20
 frame_count = 0
 warned = False
 
-# Face detection function
-def detect_faces(frame):
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    faces = detector(gray)
-    return faces
+# Face detection runs on a downscaled copy of the frame; rectangles are mapped
+# back to full resolution, where the landmark predictor refines them.
+# DETECT_SCALE = 1.0 detects on the full frame, DETECT_UPSAMPLE is dlib's
+# upsample count (each step finds smaller faces at ~4x the cost).
+DETECT_SCALE = 0.5
+DETECT_UPSAMPLE = 0
 
-# Logging function
-def log_event(message):
-    with open("activity_log.txt", "a", encoding="utf-8") as file:
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-        file.write(f"[{timestamp}] {message}\n")
+# Detection engine (see detectors.py): "dlib" runs HOG + landmarks on every
+# frame, "cascade" finds faces with Haar first and runs the landmark predictor
+# only inside them, skipping frames without a face
+DETECTOR = os.environ.get("EXAM_DETECTOR", "dlib")
+
+def create_face_detector(kind=DETECTOR):
+    dlib_detector = DlibDetector(DETECT_SCALE, DETECT_UPSAMPLE, EAR_THRESHOLD)
+    if kind == "cascade":
+        return CascadeDetector(refine=dlib_detector)
+    return dlib_detector
+
+face_detector = create_face_detector()
+
+# The dlib models (the predictor file is ~100 MB) load on first use; call
+# warm_up() to load them in the background
+def warm_up():
+    return warm_up_items([cv2, dlib, dlib_models, haar_models, keyboard, mouse])
+
+# Events go to the sessions' indexed event store (see eventstore.py) under
+# this run's id, so replay.py and session queries see them too
+SESSION_ID = time.strftime("km_%Y%m%d_%H%M%S")
+# Opened on the first event, so importing this module creates no database
+event_store = LazyResource("event store", lambda: get_event_store(event_db_path()))
+
+def log_event(message, kind="activity", data=None):
+    event_store.get().add(SESSION_ID, kind, message, data=data)
+
+# Snapshots and input telemetry go to this run's directory through the
+# storage manager (see storage.py): quality tiers, unique names, quota.
+# The run stays active (safe from retention) until run() returns.
+def open_storage():
+    manager = get_storage(SESSIONS_DIR, on_delete=event_store.get().delete_session)
+    manager.activate(SESSION_ID)
+    return manager
+
+storage = LazyResource("storage", open_storage)
+
+def save_snapshot(frame, timestamp, alert):
+    return storage.get().save_image(SESSION_ID, frame, "alert" if alert else "snapshot", timestamp)
+
+# Input events are recorded in the binary telemetry format (see telemetry.py)
+input_recorder = LazyResource("input telemetry", lambda: get_input_recorder(
+    os.path.join(storage.get().session_dir(SESSION_ID), "input_telemetry.bin")))
+
+# Closed eyes, faces and typing feed the streaming risk score (see scoring.py)
+def on_alert(alert):
+    log_event(f"Alert: {alert['message']} (risk {alert['score']:.0f})", "alert", alert)
+
+scorer = ScoringEngine(on_alert=on_alert)
 
 # Keyboard event handling
 def on_key_press(key):
-    try:
-        log_event(f"Key pressed: {key.char}")
-    except AttributeError:
-        log_event(f"Special key pressed: {key}")
+    scorer.key()
+    input_recorder.get().key(key)
     if key == keyboard.Key.esc:
+        stop()
         return False  # Stop listener
 
 # Mouse event handling
 def on_mouse_move(x, y):
-    log_event(f"Mouse moved to ({x}, {y})")
+    input_recorder.get().move(x, y)
 
 def on_mouse_click(x, y, button, pressed):
-    action = "Pressed" if pressed else "Released"
-    log_event(f"Mouse {action} {button} at ({x}, {y})")
+    input_recorder.get().click(x, y, button, pressed)
 
 def on_mouse_scroll(x, y, dx, dy):
-    log_event(f"Mouse scrolled at ({x}, {y}) by ({dx}, {dy})")
-
-# Take snapshots periodically
-def take_snapshot_periodically():
-    while True:
-        capture = cv2.VideoCapture(0)
-        ret, frame = capture.read()
-        capture.release()
-
-        if ret:
-            timestamp = time.strftime("%Y%m%d_%H%M%S", time.localtime())
-            filename = f"snapshot_{timestamp}.jpg"
-            cv2.imwrite(filename, frame)
-            print(f"Snapshot saved: {filename}")
-            log_event(f"Snapshot taken: {filename}")
-        else:
-            print("Snapshot failed")
-            log_event("Snapshot failed")
+    input_recorder.get().scroll(x, y, dx, dy)
 
-        time.sleep(20)  # Every 20 seconds
+# The video loop, snapshots and listeners run under one Supervisor (see
+# supervisor.py); stop() ends all of them from any thread
+stop_flag = threading.Event()
+supervisor = None
+
+def stop():
+    if supervisor is not None:
+        supervisor.stop()
+    else:
+        stop_flag.set()
+
+# Snapshots on motion or alerts (see snapshots.py)
+snapshotter = None
+
+def on_snapshot_saved(filename, reason):
+    print(f"Snapshot saved: {filename} ({reason})")
+    log_event(f"Snapshot taken: {filename} ({reason})", "snapshot", {"file": filename, "reason": reason})
+
+async def take_snapshots():
+    global snapshotter
+    source = await supervisor.call(open_frame_source, CAMERA_INDEX)
+    if source is None:
+        log_event("Snapshot failed: camera not available", "error")
+        raise RuntimeError("Cannot open camera")
+
+    try:
+        snapshotter = MotionSnapshotter(source, on_saved=on_snapshot_saved, writer=save_snapshot)
+        while source.is_running():
+            await supervisor.call(snapshotter.sample)
+            if await supervisor.wait(snapshotter.sample_interval):
+                return
+    finally:
+        close_frame_source(source)
+    # The camera went away; raising lets the supervisor restart snapshots
+    raise RuntimeError("Camera stopped")
 
 # Main video loop
 def video_loop():
+    source = open_frame_source(CAMERA_INDEX)
+    if source is None:
+        print("Cannot open camera")
+        return
+
+    last_seq = -1
+    while not stop_flag.is_set():
+        ref = source.acquire(after_seq=last_seq)
+        if ref is None:
+            if not source.is_running():
+                break
+            continue
+        last_seq = ref.seq
+        # Headless mode reads the shared slot directly; drawing needs a private copy
+        with ref:
+            frame = ref.frame if HEADLESS else ref.frame.copy()
+            process_frame(frame)
+
+        if not HEADLESS:
+            cv2.imshow("Face Detection", frame)
+
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+
+    stop_flag.set()
+    close_frame_source(source)
+    if not HEADLESS:
+        cv2.destroyAllWindows()
+
+def process_frame(frame):
     global frame_count, warned
-    cap = cv2.VideoCapture(0)
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        faces = detect_faces(frame)
-
-        for face in faces:
-            landmarks = predictor(frame, face)
-            left_eye = [(landmarks.part(i).x, landmarks.part(i).y) for i in range(36, 42)]
-            right_eye = [(landmarks.part(i).x, landmarks.part(i).y) for i in range(42, 48)]
-
-            left_ear = eye_aspect_ratio(left_eye)
-            right_ear = eye_aspect_ratio(right_eye)
-            ear = (left_ear + right_ear) / 2.0
-
-            if ear < EAR_THRESHOLD:
-                frame_count += 1
-                if frame_count >= FRAME_COUNT_THRESHOLD and not warned:
+    # Faces and eye metrics for every face in the frame in one batched call
+    result = face_detector.detect([frame])[0]
+    faces = result["faces"]
+    scorer.frame(len(faces))
+    if len(faces):
+        scorer.eyes(all(result["closed"]))
+
+    for (x, y, w, h), closed in zip(faces, result["closed"]):
+        if closed:
+            frame_count += 1
+            if frame_count >= FRAME_COUNT_THRESHOLD and not warned:
+                if not HEADLESS:
                     cv2.putText(frame, "Warning: Eyes closed for too long!", (50, 50),
                                 cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                    warned = True
-            else:
-                frame_count = 0
-                warned = False
+                log_event("Warning: Eyes closed for too long", "detection")
+                warned = True
+                if snapshotter is not None:
+                    snapshotter.trigger("Eyes closed")
+        else:
+            frame_count = 0
+            warned = False
 
-            x, y, w, h = (face.left(), face.top(), face.width(), face.height())
+        if not HEADLESS:
             cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2)
 
-        cv2.imshow("Face Detection", frame)
-
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
-
-    cap.release()
-    cv2.destroyAllWindows()
-
 # Start keyboard and mouse listeners
+listeners = []
+
 def start_listeners():
     kb_listener = keyboard.Listener(on_press=on_key_press)
     ms_listener = mouse.Listener(
@@ -128,12 +212,33 @@ def start_listeners():
     )
     kb_listener.start()
     ms_listener.start()
+    listeners[:] = [kb_listener, ms_listener]
+
+def stop_listeners():
+    for listener in listeners:
+        listener.stop()
+    listeners.clear()
+    # Nothing to flush (and no file to create) if no input was recorded
+    if input_recorder.loaded:
+        input_recorder.get().flush()
 
 # Run all monitoring tasks
 def run():
-    threading.Thread(target=video_loop, daemon=True).start()
-    threading.Thread(target=take_snapshot_periodically, daemon=True).start()
-    start_listeners()
+    global supervisor
+    stop_flag.clear()
+    supervisor = Supervisor("functionKM", stop_event=stop_flag)
+    supervisor.add_blocking("video", video_loop)
+    supervisor.add_task("snapshots", take_snapshots, restart=True)
+    supervisor.add_service("input", start_listeners, stop_listeners)
+    supervisor.add_periodic("storage", lambda: storage.get().maintain(MAINTENANCE_INTERVAL), MAINTENANCE_INTERVAL)
+    # Without a window there is no 'q' key; stop on ESC, SIGINT or SIGTERM
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda signum, frame: stop())
+    try:
+        supervisor.run()
+    finally:
+        if storage.loaded:
+            storage.get().deactivate(SESSION_ID)
 
 if __name__ == "__main__":
     run()
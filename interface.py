@@ -4,6 +4,9 @@ import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import datetime
 
+from session import MonitoringSession
+from monitors import FACE, GAZE, AUDIO, INPUT, SNAPSHOTS, RECORDING
+
 app = ttk.Window(themename="cyborg")
 app.title("نظام مراقبة الامتحانات")
 app.geometry("800x600")
@@ -14,6 +17,14 @@ face_detected = tk.BooleanVar()
 sound_detected = tk.BooleanVar()
 mouse_active = tk.BooleanVar()
 eye_contact = tk.BooleanVar()
+snapshots_enabled = tk.BooleanVar()
+recording_enabled = tk.BooleanVar()
+
+# Each checkbox switches one monitor of the running session (see monitors.py);
+# unchecked monitors are never started, and with nothing checked no device is opened
+MONITOR_OPTIONS = [(face_detected, FACE), (sound_detected, AUDIO), (mouse_active, INPUT), (eye_contact, GAZE),
+                   (snapshots_enabled, SNAPSHOTS), (recording_enabled, RECORDING)]
+session = None
 
 title_label = ttk.Label(app, text="نظام مراقبة الامتحانات بالذكاء الاصطناعي", font=("Helvetica", 18, "bold"), bootstyle="info")
 title_label.pack(pady=10)
@@ -27,14 +38,34 @@ ttk.Checkbutton(frame, text="كشف الوجه والعين", variable=face_dete
 ttk.Checkbutton(frame, text="كشف الصوت", variable=sound_detected, bootstyle="success").pack(anchor=W, pady=5)
 ttk.Checkbutton(frame, text="مراقبة الماوس والكيبورد", variable=mouse_active, bootstyle="success").pack(anchor=W, pady=5)
 ttk.Checkbutton(frame, text="متابعة تركيز النظر", variable=eye_contact, bootstyle="success").pack(anchor=W, pady=5)
+ttk.Checkbutton(frame, text="لقطات الكاميرا عند الحركة والتنبيهات", variable=snapshots_enabled, bootstyle="success").pack(anchor=W, pady=5)
+ttk.Checkbutton(frame, text="تسجيل الفيديو", variable=recording_enabled, bootstyle="success").pack(anchor=W, pady=5)
+
+
+def selected_monitors():
+    return [name for var, name in MONITOR_OPTIONS if var.get()]
+
+
+def on_option_changed(var, name):
+    if session is not None and session.is_alive():
+        session.set_monitor(name, var.get())
+
+for var, name in MONITOR_OPTIONS:
+    var.trace_add("write", lambda *args, var=var, name=name: on_option_changed(var, name))
 
 
 def toggle_monitoring():
+    global session
     monitoring.set(not monitoring.get())
     if monitoring.get():
+        # Recording follows its checkbox instead of the RECORD_VIDEO default
+        session = MonitoringSession(monitors=selected_monitors(), record_video=False)
+        session.start()
         start_btn.config(text="إيقاف المراقبة", bootstyle="danger")
         status_label.config(text="🟢 المراقبة قيد التشغيل", bootstyle="success")
     else:
+        if session is not None:
+            session.stop()
         start_btn.config(text="ابدأ المراقبة", bootstyle="info")
         status_label.config(text="🔴 المراقبة متوقفة", bootstyle="danger")
 
@@ -51,6 +82,12 @@ def analyze():
     report += f"- كشف الصوت: {'✅' if sound_detected.get() else '❌'}\n"
     report += f"- مراقبة الماوس والكيبورد: {'✅' if mouse_active.get() else '❌'}\n"
     report += f"- متابعة النظر: {'✅' if eye_contact.get() else '❌'}\n"
+    if session is not None:
+        status = session.status()
+        report += f"- درجة الاشتباه: {status['risk']['score']:.0f}\n"
+        for name, monitor in status["monitors"].items():
+            if monitor["error"]:
+                report += f"- {name}: {monitor['error']}\n"
     messagebox.showinfo("تحليل البيانات", report)
 
 ttk.Button(app, text="تحليل الحالة", command=analyze, bootstyle="warning-outline").pack(pady=10)
@@ -75,7 +112,13 @@ def save_report():
 ttk.Button(app, text="💾 حفظ التقرير", command=save_report, bootstyle="success").pack(pady=10)
 
 
-ttk.Button(app, text="خروج", command=app.destroy, bootstyle="danger-outline").pack(pady=10)
+def close():
+    if session is not None:
+        session.stop()
+        session.join(5)
+    app.destroy()
+
+ttk.Button(app, text="خروج", command=close, bootstyle="danger-outline").pack(pady=10)
 
 
 app.mainloop()
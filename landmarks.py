@@ -0,0 +1,49 @@
+import numpy as np
+
+# Vectorised eye metrics from 68-point dlib landmarks
+# Landmarks for all faces in a frame are stacked into one (faces, 68, 2) int
+# array and every metric is computed for all faces at once.
+
+LEFT_EYE = np.arange(36, 42)
+RIGHT_EYE = np.arange(42, 48)
+EYES = np.stack([LEFT_EYE, RIGHT_EYE])  # (2, 6)
+NOSE_TIP = 30
+EAR_THRESHOLD = 0.25
+
+
+def shape_to_array(shape, dtype=np.int32):
+    # dlib full_object_detection -> (68, 2) array
+    return np.array([(p.x, p.y) for p in shape.parts()], dtype=dtype)
+
+
+def stack_landmarks(shapes):
+    if not shapes:
+        return np.empty((0, 68, 2), dtype=np.int32)
+    return np.stack([shape_to_array(shape) for shape in shapes])
+
+
+def eye_aspect_ratios(landmarks):
+    # (faces, 68, 2) -> (faces, 2) EAR for the left and right eye
+    eyes = landmarks[:, EYES].astype(np.float32)  # (faces, 2, 6, 2)
+    vertical = np.linalg.norm(eyes[:, :, [1, 2]] - eyes[:, :, [5, 4]], axis=-1).sum(axis=-1)
+    horizontal = np.linalg.norm(eyes[:, :, 0] - eyes[:, :, 3], axis=-1)
+    return vertical / (2.0 * np.maximum(horizontal, 1e-6))
+
+
+def eye_features(landmarks, ear_threshold=EAR_THRESHOLD):
+    # Per-face EAR, closed-eye mask and a horizontal gaze/head-turn offset:
+    # where the nose tip sits between the outer eye corners, 0 = centred,
+    # -0.5/+0.5 = fully towards the left/right corner.
+    ears = eye_aspect_ratios(landmarks)
+    ear = ears.mean(axis=1)
+    outer_left = landmarks[:, LEFT_EYE[0], 0].astype(np.float32)
+    outer_right = landmarks[:, RIGHT_EYE[3], 0].astype(np.float32)
+    span = np.maximum(outer_right - outer_left, 1.0)
+    gaze = (landmarks[:, NOSE_TIP, 0] - outer_left) / span - 0.5
+    return {
+        "left_ear": ears[:, 0],
+        "right_ear": ears[:, 1],
+        "ear": ear,
+        "closed": ear < ear_threshold,
+        "gaze_offset": gaze,
+    }
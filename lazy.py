@@ -0,0 +1,115 @@
+import importlib
+import logging
+import subprocess
+import sys
+import threading
+import time
+
+# Lazy initialisation
+# lazy_import() returns a stand-in that imports the real module on first
+# attribute access, and LazyResource does the same for models and data files
+# (it is also callable, so `predictor(frame, face)` call sites stay unchanged).
+# warm_up() loads a list of them on a background thread so the cost is paid
+# while the UI is already on screen. Every load is timed into LOAD_TIMES.
+
+LOAD_TIMES = {}
+
+
+class LazyModule:
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    LOAD_TIMES[self._name] = time.perf_counter() - start
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name} ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+class LazyResource:
+    def __init__(self, name, loader):
+        self.name = name
+        self._loader = loader
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def get(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    start = time.perf_counter()
+                    self._value = self._loader()
+                    LOAD_TIMES[self.name] = time.perf_counter() - start
+                    self._loaded = True
+        return self._value
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def _load(self):
+        return self.get()
+
+    def __call__(self, *args, **kwargs):
+        return self.get()(*args, **kwargs)
+
+
+def warm_up(items, name="warm-up"):
+    # Loads lazy modules/resources in the background; failures are logged, and
+    # the item will simply be retried (and fail visibly) on first real use
+    def run():
+        for item in items:
+            try:
+                item._load()
+            except Exception as e:
+                logging.warning(f"Warm-up of {item!r} failed: {e}")
+        logging.info(startup_report())
+
+    thread = threading.Thread(target=run, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+def startup_report():
+    lines = ["Load times:"]
+    for name, seconds in sorted(LOAD_TIMES.items(), key=lambda item: -item[1]):
+        lines.append(f"  {name:40s} {seconds * 1000:8.1f} ms")
+    return "\n".join(lines)
+
+
+# Cold import cost of each dependency, measured in a fresh interpreter
+DEPENDENCIES = ["cv2", "numpy", "dlib", "pandas", "scipy.spatial", "sounddevice",
+                "pynput.keyboard", "pynput.mouse", "pyautogui", "ttkbootstrap", "tkinter"]
+
+
+def measure_imports(names=DEPENDENCIES):
+    results = {}
+    for name in names:
+        code = f"import time; t = time.perf_counter(); import {name}; print(time.perf_counter() - t)"
+        proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        results[name] = float(proc.stdout) if proc.returncode == 0 else None
+    return results
+
+
+if __name__ == "__main__":
+    for name, seconds in measure_imports().items():
+        cost = f"{seconds * 1000:8.1f} ms" if seconds is not None else "  not installed"
+        print(f"{name:20s} {cost}")
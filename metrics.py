@@ -0,0 +1,232 @@
+import bisect
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Monitoring metrics
+# Counters, fixed-bucket latency histograms and callback gauges (queue depths)
+# kept in one process-wide registry. Recording a value is a lock-protected
+# integer/float update, cheap enough to leave on for every frame. The registry
+# can be dumped to the log periodically and served in Prometheus text format
+# on a local HTTP port.
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+METRICS_PORT = 9108
+DUMP_INTERVAL = 60
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def render(self):
+        return [f"{self.name}{_label_text(self.labels)} {self.value}"]
+
+    def summary(self):
+        return self.value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def time(self):
+        return _Timer(self)
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-quantile
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if total == 0:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def render(self):
+        with self._lock:
+            counts, total, value_sum = list(self.counts), self.count, self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            labels = _label_text(self.labels + (("le", le),))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        lines.append(f"{self.name}_sum{_label_text(self.labels)} {value_sum}")
+        lines.append(f"{self.name}_count{_label_text(self.labels)} {total}")
+        return lines
+
+    def summary(self):
+        mean = self.sum / self.count if self.count else 0.0
+        return {"count": self.count, "mean_ms": round(mean * 1000, 2),
+                "p50_ms": self.quantile(0.5) * 1000, "p95_ms": self.quantile(0.95) * 1000}
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name, labels, func):
+        self.name = name
+        self.labels = labels
+        self.func = func
+
+    def value(self):
+        try:
+            return self.func()
+        except Exception:
+            return float("nan")
+
+    def render(self):
+        return [f"{self.name}{_label_text(self.labels)} {self.value()}"]
+
+    def summary(self):
+        return self.value()
+
+
+class _Timer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, labels, help, *args):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = cls(name, key[1], *args)
+                self._metrics[key] = metric
+                if help:
+                    self._help[name] = help
+            return metric
+
+    def counter(self, name, help="", labels=None):
+        return self._get(Counter, name, labels, help)
+
+    def histogram(self, name, help="", labels=None, buckets=LATENCY_BUCKETS):
+        return self._get(Histogram, name, labels, help, buckets)
+
+    def gauge(self, name, func, help="", labels=None):
+        # Re-registering replaces the callback (e.g. a restarted pipeline)
+        gauge = self._get(Gauge, name, labels, help, func)
+        gauge.func = func
+        return gauge
+
+    def remove_labelled(self, key, value):
+        # Drop every metric carrying the label key=value (e.g. a finished session)
+        with self._lock:
+            for metric_key in [k for k in self._metrics if (key, value) in k[1]]:
+                del self._metrics[metric_key]
+
+    def render_prometheus(self):
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        seen = set()
+        for (name, _), metric in metrics:
+            if name not in seen:
+                seen.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        return {f"{name}{_label_text(labels)}": metric.summary() for (name, labels), metric in metrics}
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+histogram = REGISTRY.histogram
+gauge = REGISTRY.gauge
+
+
+def stage_timer(stage):
+    # Per-stage latency histogram: `with stage_timer("face_detect"): ...`
+    return histogram("stage_latency_seconds", "Per-stage processing latency", {"stage": stage}).time()
+
+
+def start_stats_dump(stop_event, interval=DUMP_INTERVAL, registry=REGISTRY):
+    def run():
+        while not stop_event.wait(interval):
+            logging.info(f"Metrics: {registry.snapshot()}")
+
+    thread = threading.Thread(target=run, name="metrics-dump", daemon=True)
+    thread.start()
+    return thread
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port=METRICS_PORT, host="127.0.0.1"):
+    # Serves /metrics on a daemon thread; returns the server (call shutdown() to stop)
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,109 @@
+import logging
+import threading
+
+# Monitor registry
+# Each monitoring capability of a session (Haar face/eye detection, dlib EAR
+# gaze, audio, input listeners, snapshots, recording) is registered as a named monitor
+# with a start and a stop function. Only enabled monitors are started, so a
+# disabled one runs no code and opens no device. Monitors can be switched on
+# and off while the session runs; the registry remembers the wanted state
+# while the session is not active and applies it on activate().
+
+FACE = "face"
+GAZE = "gaze"
+AUDIO = "audio"
+INPUT = "input"
+SNAPSHOTS = "snapshots"
+RECORDING = "recording"
+
+ALL_MONITORS = (FACE, GAZE, AUDIO, INPUT, SNAPSHOTS, RECORDING)
+DEFAULT_MONITORS = (FACE, AUDIO, INPUT, SNAPSHOTS)
+
+
+class Monitor:
+    def __init__(self, name, start, stop, description=""):
+        self.name = name
+        self.start = start
+        self.stop = stop
+        self.description = description
+        self.enabled = False
+        self.running = False
+        self.error = None
+
+
+class MonitorRegistry:
+    def __init__(self, enabled=DEFAULT_MONITORS):
+        self._monitors = {}
+        self._wanted = set(enabled)
+        self._lock = threading.RLock()
+        self.active = False
+
+    def register(self, name, start, stop, description=""):
+        with self._lock:
+            monitor = Monitor(name, start, stop, description)
+            monitor.enabled = name in self._wanted
+            self._monitors[name] = monitor
+            return monitor
+
+    def names(self):
+        return list(self._monitors)
+
+    def is_enabled(self, name):
+        monitor = self._monitors.get(name)
+        return monitor is not None and monitor.enabled
+
+    def is_running(self, name):
+        # Cheap enough for per-frame checks
+        monitor = self._monitors.get(name)
+        return monitor is not None and monitor.running
+
+    def set_enabled(self, name, enabled):
+        with self._lock:
+            monitor = self._monitors[name]
+            monitor.enabled = enabled
+            if self.active:
+                if enabled:
+                    self._start(monitor)
+                else:
+                    self._stop(monitor)
+
+    def activate(self):
+        with self._lock:
+            self.active = True
+            for monitor in self._monitors.values():
+                if monitor.enabled:
+                    self._start(monitor)
+
+    def deactivate(self):
+        with self._lock:
+            self.active = False
+            for monitor in reversed(list(self._monitors.values())):
+                self._stop(monitor)
+
+    def _start(self, monitor):
+        if monitor.running:
+            return
+        try:
+            monitor.start()
+            monitor.running = True
+            monitor.error = None
+            logging.info(f"Monitor {monitor.name} started")
+        except Exception as e:
+            monitor.error = str(e)
+            logging.error(f"Monitor {monitor.name} failed to start: {e}")
+
+    def _stop(self, monitor):
+        if not monitor.running:
+            return
+        monitor.running = False
+        try:
+            monitor.stop()
+            logging.info(f"Monitor {monitor.name} stopped")
+        except Exception as e:
+            monitor.error = str(e)
+            logging.error(f"Monitor {monitor.name} failed to stop: {e}")
+
+    def status(self):
+        with self._lock:
+            return {name: {"enabled": monitor.enabled, "running": monitor.running, "error": monitor.error}
+                    for name, monitor in self._monitors.items()}
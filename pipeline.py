@@ -0,0 +1,191 @@
+import queue
+import threading
+import time
+import logging
+
+from metrics import gauge
+
+# Staged frame pipeline
+# A source stage produces packets (dicts) and every following stage runs on its
+# own thread, connected to the next one by a bounded queue. A full queue blocks
+# the producer (backpressure), except for the final output queue, which drops
+# the oldest packet so a slow display never stalls recording. Stages that can
+# fall behind (detection) may pass a `skip` function: when more packets are
+# already waiting, the current one goes through `skip` instead of `func`.
+# A packet whose stage raised is passed on the same way (through `skip`, or
+# unchanged), so one failing stage never starves the stages after it.
+
+DEFAULT_QUEUE_SIZE = 8
+SOURCE_IDLE_WAIT = 0.05  # pause after the source returned nothing or failed
+ERROR_LOG_EVERY = 100  # a stage failing on every packet logs once per this many
+_STOP = object()
+
+
+class StageStats:
+    def __init__(self):
+        self.processed = 0
+        self.skipped = 0
+        self.errors = 0
+        self.fps = 0.0
+        self._window_start = time.monotonic()
+        self._window_count = 0
+
+    def tick(self):
+        self.processed += 1
+        self._window_count += 1
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.fps = self._window_count / elapsed
+            self._window_start = now
+            self._window_count = 0
+
+
+class Stage:
+    def __init__(self, name, func, inbox, skip=None):
+        self.name = name
+        self.func = func
+        self.skip = skip
+        self.inbox = inbox
+        self.outbox = None
+        self.stats = StageStats()
+        self.thread = None
+
+
+class Pipeline:
+    def __init__(self, queue_size=DEFAULT_QUEUE_SIZE, keep_output=True):
+        # keep_output=False discards what the last stage returns (nobody reads it)
+        self.queue_size = queue_size
+        self.keep_output = keep_output
+        self._source = None
+        self._stages = []
+        self._output = queue.Queue(maxsize=queue_size)
+        self._stop_event = threading.Event()
+        self._done = threading.Event()
+
+    def set_source(self, name, func):
+        # func() returns the next packet, or None when no frame is ready yet
+        self._source = Stage(name, func, None)
+
+    def add_stage(self, name, func, skip=None):
+        # func(packet) returns the packet to pass on, or None to drop it
+        self._stages.append(Stage(name, func, queue.Queue(maxsize=self.queue_size), skip))
+
+    def start(self):
+        chain = [self._source] + self._stages
+        for stage, following in zip(chain, chain[1:]):
+            stage.outbox = following.inbox
+        chain[-1].outbox = self._output
+
+        self._source.thread = threading.Thread(target=self._run_source, name=self._source.name, daemon=True)
+        for stage in self._stages:
+            stage.thread = threading.Thread(target=self._run_stage, args=(stage,), name=stage.name, daemon=True)
+        for stage in chain:
+            stage.thread.start()
+
+    def stop(self, timeout=5):
+        self._stop_event.set()
+        for stage in [self._source] + self._stages:
+            if stage.thread is not None:
+                stage.thread.join(timeout=timeout)
+
+    def is_running(self):
+        return not self._done.is_set()
+
+    def get_output(self, timeout=0.1):
+        try:
+            item = self._output.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        return None if item is _STOP else item
+
+    def _put(self, stage, item):
+        if stage.outbox is not self._output:
+            stage.outbox.put(item)
+            return
+        if not self.keep_output and item is not _STOP:
+            return
+        while True:
+            try:
+                self._output.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._output.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _run_source(self):
+        stage = self._source
+        while not self._stop_event.is_set():
+            try:
+                item = stage.func()
+            except Exception as e:
+                stage.stats.errors += 1
+                logging.error(f"Pipeline stage {stage.name} failed: {e}")
+                self._stop_event.wait(SOURCE_IDLE_WAIT)
+                continue
+            if item is None:
+                # No frame (e.g. the camera stopped and acquire() returns at
+                # once); back off instead of spinning until stop()
+                self._stop_event.wait(SOURCE_IDLE_WAIT)
+                continue
+            stage.stats.tick()
+            self._put(stage, item)
+        self._put(stage, _STOP)
+
+    def _run_stage(self, stage):
+        while True:
+            item = stage.inbox.get()
+            if item is _STOP:
+                self._put(stage, _STOP)
+                break
+            packet = item
+            try:
+                if stage.skip is not None and stage.inbox.qsize() > 0:
+                    item = stage.skip(packet)
+                    stage.stats.skipped += 1
+                else:
+                    item = stage.func(packet)
+            except Exception as e:
+                stage.stats.errors += 1
+                if stage.stats.errors % ERROR_LOG_EVERY == 1:
+                    logging.error(f"Pipeline stage {stage.name} failed ({stage.stats.errors} errors): {e}")
+                item = self._recover(stage, packet)
+            stage.stats.tick()
+            if item is not None:
+                self._put(stage, item)
+        if stage is self._stages[-1]:
+            self._done.set()
+
+    def _recover(self, stage, packet):
+        # Failed packet: through skip if the stage has one, otherwise unchanged
+        if stage.skip is not None:
+            try:
+                return stage.skip(packet)
+            except Exception as e:
+                logging.error(f"Pipeline stage {stage.name} skip failed: {e}")
+        return packet
+
+    def export_metrics(self, labels=None):
+        # Queue depth and throughput of every stage as metrics gauges; `labels`
+        # are added to each (e.g. {"session": ...} when several pipelines run)
+        labels = labels or {}
+        for stage in self._stages:
+            gauge("queue_depth", stage.inbox.qsize, labels={"queue": stage.name, **labels})
+        for stage in [self._source] + self._stages:
+            gauge("stage_fps", lambda stats=stage.stats: stats.fps, "Packets per second", {"stage": stage.name, **labels})
+            gauge("stage_skipped", lambda stats=stage.stats: stats.skipped, "Packets passed through skip", {"stage": stage.name, **labels})
+
+    def stats(self):
+        result = {}
+        for stage in [self._source] + self._stages:
+            result[stage.name] = {
+                "processed": stage.stats.processed,
+                "skipped": stage.stats.skipped,
+                "errors": stage.stats.errors,
+                "fps": round(stage.stats.fps, 1),
+                "queue_depth": stage.inbox.qsize() if stage.inbox is not None else 0,
+            }
+        result["output"] = {"queue_depth": self._output.qsize()}
+        return result
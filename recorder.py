@@ -0,0 +1,135 @@
+import logging
+import os
+import queue
+import threading
+import time
+
+from lazy import lazy_import
+
+cv2 = lazy_import("cv2")
+
+# Segmented video recorder
+# write() only puts (frame, capture timestamp) on a bounded queue; an encoder
+# thread owns the VideoWriter. Output is split into segments of
+# SEGMENT_SECONDS, so a crash loses at most the open segment. The writer has a
+# constant frame rate, so frames are placed by their capture timestamp: gaps
+# (dropped frames) are filled by repeating the previous frame and frames
+# arriving faster than the nominal rate are skipped, keeping playback time
+# equal to wall time. Each segment gets a "<name>.csv" sidecar listing the
+# capture timestamp of every real frame.
+
+CODEC = "XVID"
+FPS = 20.0
+FRAME_SIZE = (320, 240)
+SEGMENT_SECONDS = 300
+QUEUE_SIZE = 64
+EXTENSIONS = {"XVID": ".avi", "MJPG": ".avi", "mp4v": ".mp4", "avc1": ".mp4"}
+
+
+class SegmentedRecorder:
+    def __init__(self, prefix="recording", codec=CODEC, fps=FPS, size=FRAME_SIZE,
+                 segment_seconds=SEGMENT_SECONDS, queue_size=QUEUE_SIZE, directory="."):
+        self.prefix = prefix
+        self.codec = codec
+        self.fps = fps
+        self.size = tuple(size)
+        self.segment_seconds = segment_seconds
+        self.directory = directory
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._writer = None
+        self._sidecar = None
+        self.segments = []
+        self.frames_written = 0
+        self.frames_repeated = 0
+        self.frames_skipped = 0
+        self.frames_dropped = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="encoder", daemon=True)
+        self._thread.start()
+
+    def write(self, frame, timestamp=None):
+        # Never blocks the caller; a full queue drops the frame (the gap is
+        # filled by repeating the previous frame when encoding)
+        try:
+            self._queue.put_nowait((frame, timestamp if timestamp is not None else time.time()))
+            return True
+        except queue.Full:
+            self.frames_dropped += 1
+            return False
+
+    def stop(self, timeout=10):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def _open_segment(self, timestamp):
+        stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(timestamp))
+        name = f"{self.prefix}_{stamp}_{len(self.segments):03d}{EXTENSIONS.get(self.codec, '.avi')}"
+        path = os.path.join(self.directory, name)
+        self._writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*self.codec), self.fps, self.size)
+        self._sidecar = open(path + ".csv", "w", encoding="utf-8")
+        self._sidecar.write("frame,timestamp\n")
+        self._segment_start = timestamp
+        self._segment_frames = 0
+        self.segments.append(path)
+        logging.info(f"Recording segment {path}")
+
+    def _close_segment(self):
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+        if self._sidecar is not None:
+            self._sidecar.close()
+            self._sidecar = None
+
+    def _run(self):
+        last_frame = None
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            frame, timestamp = item
+            if frame.shape[1::-1] != self.size:
+                frame = cv2.resize(frame, self.size)
+
+            try:
+                if self._writer is None or timestamp - self._segment_start >= self.segment_seconds:
+                    self._close_segment()
+                    self._open_segment(timestamp)
+                    last_frame = None
+
+                # Frame slot this capture time belongs to within the segment
+                target = int(round((timestamp - self._segment_start) * self.fps))
+                if target < self._segment_frames:
+                    self.frames_skipped += 1
+                    continue
+                while last_frame is not None and self._segment_frames < target:
+                    self._writer.write(last_frame)
+                    self._segment_frames += 1
+                    self.frames_repeated += 1
+
+                self._writer.write(frame)
+                self._sidecar.write(f"{self._segment_frames},{timestamp:.3f}\n")
+                self._segment_frames += 1
+                self.frames_written += 1
+                last_frame = frame
+            except Exception as e:
+                logging.error(f"Encoder error: {e}")
+        self._close_segment()
+
+    def stats(self):
+        return {
+            "segments": len(self.segments),
+            "written": self.frames_written,
+            "repeated": self.frames_repeated,
+            "skipped": self.frames_skipped,
+            "dropped": self.frames_dropped,
+            "queue_depth": self.queue_depth(),
+        }
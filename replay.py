@@ -0,0 +1,351 @@
+import argparse
+import csv
+import glob
+import gzip
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from lazy import lazy_import
+from detectors import create_detector
+from scoring import ScoringEngine
+from eventstore import EventStore
+
+cv2 = lazy_import("cv2")
+
+# Offline session replay
+# Streams a recorded session directory (the recorder's video segments and
+# their frame,timestamp sidecars, see recorder.py) through the detectors much
+# faster than real time:
+#   - only frames the camera really delivered are analysed (the recorder's
+#     repeated filler frames are skipped using the sidecar), and of those
+#     only every `step`-th, SAMPLE_FPS per second by default; skipped frames
+#     are grab()bed, which decodes but neither converts nor copies them
+#   - every segment is cut into CHUNK_SECONDS chunks that are decoded and
+#     detected in parallel worker processes, in batches of BATCH_FRAMES
+#   - the chunks of all sessions share one process pool, so a directory of
+#     sessions is analysed in parallel too
+# The results are fed in time order through the scoring engine and merged by
+# timestamp with the session's event store rows (or, for older sessions, its
+# text logs and snapshot files) into a compact incident timeline. Every
+# incident carries a jump-to position: the segment file and the offset in it.
+# Usage:
+#   python replay.py sessions/<session id>
+#   python replay.py sessions --detector cascade --workers 6 --output report.json
+
+SESSIONS_DIR = "sessions"
+EVENT_DB = os.path.join(SESSIONS_DIR, "events.db")
+VIDEO_SUFFIXES = (".avi", ".mp4")
+SAMPLE_FPS = 4.0
+CHUNK_SECONDS = 60
+BATCH_FRAMES = 8
+MERGE_GAP = 10.0  # incidents of the same kind closer than this are merged
+TIMELINE_KINDS = ["alert", "activity", "snapshot", "error"]
+
+STAMP = re.compile(r"_(\d{8}_\d{6})(?:_(\d{3}))?")
+LOG_LINE = re.compile(r"^\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)\] (.*)$")
+
+
+def parse_stamp(name, millis=True):
+    # Epoch time from a "<kind>_YYYYmmdd_HHMMSS[_mmm]" file name, or None.
+    # Storage artifacts end in milliseconds (storage.unique_path); recorder
+    # segments end in their segment index instead, so pass millis=False.
+    match = STAMP.search(os.path.basename(name))
+    if match is None:
+        return None
+    ts = time.mktime(time.strptime(match.group(1), "%Y%m%d_%H%M%S"))
+    return ts + int(match.group(2)) / 1000 if millis and match.group(2) else ts
+
+
+def open_text(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def find_sidecar(video):
+    # Compaction gzips the sidecar (see storage.py)
+    for path in (video + ".csv", video + ".csv.gz"):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def read_sidecar(path):
+    # [(frame index, capture timestamp)] of the real frames in a segment
+    with open_text(path) as file:
+        return [(int(row["frame"]), float(row["timestamp"])) for row in csv.DictReader(file)]
+
+
+def segment_frames(video):
+    # Real frames of one segment and its nominal fps; without a sidecar every
+    # frame is real and times come from the file name
+    cap = cv2.VideoCapture(video)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 20.0
+    count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    sidecar = find_sidecar(video)
+    if sidecar is not None:
+        frames = read_sidecar(sidecar)
+        if frames:
+            return frames, fps
+    start = parse_stamp(video, millis=False) or os.path.getmtime(video) - count / fps
+    return [(i, start + i / fps) for i in range(count)], fps
+
+
+class Segment:
+    def __init__(self, path, frames, fps):
+        self.path = path
+        self.fps = fps
+        self.frames = frames
+        # Frame 0 is written at the segment start; playback time equals wall time
+        self.start = frames[0][1] - frames[0][0] / fps if frames else 0.0
+        self.end = frames[-1][1] if frames else 0.0
+
+    def position(self, ts):
+        return ts - self.start
+
+
+def plan_jobs(session_id, segments, step, kind, chunk_seconds=CHUNK_SECONDS):
+    # Chunks of (session, segment, [(frame, ts) to analyse]) for the workers
+    jobs = []
+    for segment in segments:
+        wanted = segment.frames[::step]
+        chunk_frames = max(1, int(chunk_seconds * segment.fps))
+        chunk = []
+        for frame, ts in wanted:
+            if chunk and frame // chunk_frames != chunk[0][0] // chunk_frames:
+                jobs.append((session_id, segment.path, chunk, kind))
+                chunk = []
+            chunk.append((frame, ts))
+        if chunk:
+            jobs.append((session_id, segment.path, chunk, kind))
+    return jobs
+
+
+_detectors = {}
+
+
+def _detector(kind):
+    # One detector per worker process, models loaded on the first chunk
+    detector = _detectors.get(kind)
+    if detector is None:
+        detector = _detectors[kind] = create_detector(kind)
+        detector.warm_up()
+    return detector
+
+
+def analyze_chunk(job):
+    # Worker: decode one chunk and detect on the wanted frames in batches.
+    # Returns [(ts, faces, looking_out, eyes closed or None)].
+    session_id, path, wanted, kind = job
+    detector = _detector(kind)
+    cap = cv2.VideoCapture(path)
+    index = wanted[0][0]
+    if index:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+    samples = []
+    batch, stamps = [], []
+
+    def flush():
+        for ts, result in zip(stamps, detector.detect(batch)):
+            closed = result.get("closed")
+            samples.append((ts, len(result["faces"]), result.get("looking_out", 0),
+                            all(closed) if closed else None))
+        batch.clear()
+        stamps.clear()
+
+    try:
+        for frame_index, ts in wanted:
+            while index < frame_index and cap.grab():
+                index += 1
+            ok, frame = cap.read() if index == frame_index else (False, None)
+            index += 1
+            if not ok:
+                break
+            batch.append(frame)
+            stamps.append(ts)
+            if len(batch) >= BATCH_FRAMES:
+                flush()
+        if batch:
+            flush()
+    finally:
+        cap.release()
+    return samples
+
+
+def score_samples(session_id, samples):
+    # Replays the detections through the same streaming engine a live session uses
+    alerts = []
+    scorer = ScoringEngine(session_id, on_alert=alerts.append)
+    peak = 0.0
+    for ts, faces, looking_out, closed in sorted(samples):
+        scorer.frame(faces, looking_out, ts)
+        if closed is not None:
+            scorer.eyes(closed, ts)
+        peak = max(peak, scorer.score)
+    return alerts, peak
+
+
+def logged_events(session_id, session_dir, db, start, end):
+    # Events of the session from the event store; older sessions fall back to
+    # their text logs and snapshot files
+    events = []
+    if db and os.path.exists(db):
+        store = EventStore(db)
+        events = [{"ts": row["ts"], "kind": row["kind"], "message": row["message"], "source": "events"}
+                  for row in store.query(session_id, start, end, TIMELINE_KINDS)]
+        store.close()
+    if events:
+        return events
+    for path in glob.glob(os.path.join(session_dir, "activity_log.txt*")):
+        with open_text(path) as file:
+            for line in file:
+                match = LOG_LINE.match(line.rstrip("\n"))
+                if match:
+                    ts = time.mktime(time.strptime(match.group(1), "%Y-%m-%d %H:%M:%S"))
+                    events.append({"ts": ts, "kind": "activity", "message": match.group(2), "source": "log"})
+    for path in glob.glob(os.path.join(session_dir, "*.jpg")):
+        ts = parse_stamp(path)
+        if ts is not None:
+            kind = "alert" if os.path.basename(path).startswith("alert") else "snapshot"
+            events.append({"ts": ts, "kind": kind, "message": f"Snapshot {os.path.basename(path)}",
+                           "source": "files"})
+    return events
+
+
+def build_timeline(incidents, segments, merge_gap=MERGE_GAP):
+    # Sorted incidents, repeats of the same message within merge_gap merged,
+    # each with the segment and offset to jump to
+    timeline = []
+    last = {}
+    for incident in sorted(incidents, key=lambda item: item["ts"]):
+        key = (incident["kind"], incident["message"])
+        previous = last.get(key)
+        if previous is not None and incident["ts"] - previous["end"] <= merge_gap:
+            previous["end"] = incident["ts"]
+            previous["count"] += 1
+            continue
+        entry = {**incident, "end": incident["ts"], "count": 1, "segment": None, "offset": None}
+        for segment in segments:
+            if segment.start <= incident["ts"] <= segment.end + 1.0:
+                entry["segment"] = os.path.basename(segment.path)
+                entry["offset"] = round(segment.position(incident["ts"]), 2)
+                break
+        last[key] = entry
+        timeline.append(entry)
+    return timeline
+
+
+def format_offset(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def format_incident(entry):
+    stamp = time.strftime("%H:%M:%S", time.localtime(entry["ts"]))
+    text = f"[{stamp}] {entry['kind']}: {entry['message']}"
+    if entry["count"] > 1:
+        text += f" ×{entry['count']} (until {time.strftime('%H:%M:%S', time.localtime(entry['end']))})"
+    if entry["segment"] is not None:
+        text += f"  -> {entry['segment']} @ {format_offset(entry['offset'])}"
+    return text
+
+
+def find_sessions(root):
+    # Session directories below root (or root itself) that contain video
+    def has_video(path):
+        return any(name.endswith(VIDEO_SUFFIXES) for name in os.listdir(path))
+
+    if has_video(root):
+        return [root]
+    return sorted(os.path.join(root, name) for name in os.listdir(root)
+                  if os.path.isdir(os.path.join(root, name)) and has_video(os.path.join(root, name)))
+
+
+def analyze_sessions(session_dirs, detector="haar", sample_fps=SAMPLE_FPS, step=None, workers=None,
+                     db=EVENT_DB):
+    plans = {}
+    jobs = []
+    for session_dir in session_dirs:
+        session_id = os.path.basename(os.path.normpath(session_dir))
+        videos = sorted(path for path in glob.glob(os.path.join(session_dir, "*"))
+                        if path.endswith(VIDEO_SUFFIXES))
+        segments = [Segment(video, *segment_frames(video)) for video in videos]
+        segments = [segment for segment in segments if segment.frames]
+        if not segments:
+            logging.warning(f"No readable video in {session_dir}")
+            continue
+        session_step = step or max(1, int(round(segments[0].fps / sample_fps)))
+        plans[session_id] = (session_dir, segments, session_step)
+        jobs.extend(plan_jobs(session_id, segments, session_step, detector))
+
+    samples = {session_id: [] for session_id in plans}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(analyze_chunk, job): job for job in jobs}
+        for future in as_completed(futures):
+            session_id, path = futures[future][:2]
+            try:
+                samples[session_id].extend(future.result())
+            except Exception as e:
+                logging.error(f"Chunk of {path} failed: {e}")
+
+    reports = {}
+    for session_id, (session_dir, segments, session_step) in plans.items():
+        alerts, peak = score_samples(session_id, samples[session_id])
+        incidents = [{"ts": alert["timestamp"], "kind": "detection", "message": alert["message"],
+                      "source": "replay"} for alert in alerts]
+        start, end = segments[0].start, segments[-1].end
+        incidents.extend(logged_events(session_id, session_dir, db, start, end + 1.0))
+        reports[session_id] = {
+            "directory": session_dir,
+            "detector": detector,
+            "step": session_step,
+            "segments": [os.path.basename(segment.path) for segment in segments],
+            "video_seconds": round(sum(segment.end - segment.start for segment in segments), 1),
+            "frames_analysed": len(samples[session_id]),
+            "peak_score": round(peak, 1),
+            "timeline": build_timeline(incidents, segments),
+        }
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyse recorded sessions offline")
+    parser.add_argument("path", nargs="?", default=SESSIONS_DIR,
+                        help="session directory, or a directory of sessions")
+    parser.add_argument("--detector", default="haar", choices=["haar", "dlib", "cascade"])
+    parser.add_argument("--fps", type=float, default=SAMPLE_FPS, help="frames analysed per second of video")
+    parser.add_argument("--step", type=int, help="analyse every Nth recorded frame (overrides --fps)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--db", default=EVENT_DB, help="event store to align with")
+    parser.add_argument("--output", help="JSON report to write")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    session_dirs = find_sessions(args.path)
+    if not session_dirs:
+        print(f"No recorded sessions in {args.path}")
+        return
+    started = time.perf_counter()
+    reports = analyze_sessions(session_dirs, args.detector, args.fps, args.step, args.workers, args.db)
+    elapsed = time.perf_counter() - started
+    for session_id, report in reports.items():
+        print(f"\n{session_id}: {report['video_seconds'] / 60:.1f} min of video, "
+              f"{report['frames_analysed']} frames, peak risk {report['peak_score']:.0f}")
+        for entry in report["timeline"]:
+            print("  " + format_incident(entry))
+    video_seconds = sum(report["video_seconds"] for report in reports.values())
+    print(f"\nAnalysed {video_seconds / 60:.1f} min of video in {elapsed:.1f} s "
+          f"({video_seconds / max(elapsed, 1e-6):.0f}x real time)")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(reports, file, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+import collections
+import threading
+import time
+
+# Streaming suspicion score
+# Detectors and listeners report structured observations (a frame's face/eye
+# counts, audio on/off, key presses, closed eyes) instead of free text. The
+# engine keeps sliding-window aggregates in fixed time buckets, so every
+# observation costs O(1) no matter how long the window is, and recomputes a
+# 0-100 risk score and its alerts on the spot. Durations (no face, audio
+# active) are integrated between observations from the previous state.
+
+WINDOW_SECONDS = 60.0
+BUCKET_SECONDS = 1.0
+BURST_SECONDS = 2.0       # keystrokes within this span form one burst check
+BURST_KEYS = 15           # more keys than this inside BURST_SECONDS is a burst
+NO_FACE_ALERT_SECONDS = 3.0
+EYES_CLOSED_ALERT_SECONDS = 2.0
+MULTI_FACE_ALERT_RATIO = 0.05  # of the window's frames; a flickering second face adds up
+GAZE_AWAY_ALERT_RATIO = 0.5
+AUDIO_ALERT_RATIO = 0.3
+SCORE_ALERT = 60.0
+
+# Alert debouncing, in seconds; a number or a {kind: seconds} dict.
+# An alert fires only after its condition held for ALERT_HOLD, is re-armed once
+# the condition stayed clear for ALERT_CLEAR, and fires at most once per
+# ALERT_COOLDOWN per kind, so a flickering detector cannot flood alerts.
+ALERT_HOLD = {"default": 1.0, "key_burst": 0.0}
+ALERT_CLEAR = 2.0
+ALERT_COOLDOWN = 30.0
+
+# Feature -> (weight, value at which the feature counts as fully suspicious)
+WEIGHTS = {
+    "no_face_ratio": (3.0, 0.2),
+    "no_face_streak": (2.0, NO_FACE_ALERT_SECONDS * 2),
+    "multi_face_ratio": (3.0, MULTI_FACE_ALERT_RATIO),
+    "gaze_away_ratio": (2.0, GAZE_AWAY_ALERT_RATIO),
+    "eyes_closed_streak": (1.0, EYES_CLOSED_ALERT_SECONDS * 2),
+    "key_bursts": (1.0, 3),
+    "audio_ratio": (2.0, AUDIO_ALERT_RATIO),
+}
+
+
+class WindowSum:
+    # Sum and count of values over the last `window` seconds, kept per bucket
+    def __init__(self, window=WINDOW_SECONDS, bucket=BUCKET_SECONDS):
+        self.window = window
+        self.bucket = bucket
+        self._buckets = collections.deque()  # [bucket index, sum, count]
+        self.sum = 0.0
+        self.count = 0
+
+    def add(self, ts, value=1.0):
+        index = int(ts // self.bucket)
+        if self._buckets and self._buckets[-1][0] == index:
+            entry = self._buckets[-1]
+            entry[1] += value
+            entry[2] += 1
+        else:
+            self._buckets.append([index, value, 1])
+        self.sum += value
+        self.count += 1
+        self.expire(ts)
+
+    def expire(self, now):
+        oldest = int((now - self.window) // self.bucket)
+        while self._buckets and self._buckets[0][0] <= oldest:
+            _, value, count = self._buckets.popleft()
+            self.sum -= value
+            self.count -= count
+
+
+def _setting(value, kind):
+    if isinstance(value, dict):
+        return value.get(kind, value.get("default", 0.0))
+    return value
+
+
+class ScoringEngine:
+    def __init__(self, session_id=None, window=WINDOW_SECONDS, on_alert=None, on_score=None,
+                 hold=ALERT_HOLD, clear=ALERT_CLEAR, cooldown=ALERT_COOLDOWN):
+        self.session_id = session_id
+        self.window = window
+        self.hold = hold
+        self.clear = clear
+        self.cooldown = cooldown
+        self.on_alert = on_alert
+        self.on_score = on_score
+        self._lock = threading.Lock()
+        self._frames = WindowSum(window)
+        self._face_frames = WindowSum(window)
+        self._multi_face = WindowSum(window)
+        self._gaze_away = WindowSum(window)
+        self._no_face_time = WindowSum(window)
+        self._audio_time = WindowSum(window)
+        self._elapsed = WindowSum(window)
+        self._keys = collections.deque()
+        self._bursts = WindowSum(window)
+        self._in_burst = False
+        self._last_ts = None
+        self._face_count = 1
+        self._no_face_since = None
+        self._closed_since = None
+        self._audio_active = False
+        self._active_alerts = set()
+        self._pending_since = {}
+        self._clear_since = {}
+        self._last_alert = {}
+        self.score = 0.0
+        self.features = dict.fromkeys(WEIGHTS, 0.0)
+        self.alerts = collections.deque(maxlen=100)
+
+    # Observations (any thread)
+
+    def frame(self, faces, looking_out=0, ts=None):
+        ts = ts or time.time()
+        with self._lock:
+            self._advance(ts)
+            self._frames.add(ts)
+            if faces:
+                self._face_frames.add(ts)
+                self._gaze_away.add(ts, 1.0 if looking_out else 0.0)
+                self._no_face_since = None
+            elif self._no_face_since is None:
+                self._no_face_since = ts
+            self._multi_face.add(ts, 1.0 if faces > 1 else 0.0)
+            self._face_count = faces
+            self._update(ts)
+
+    def eyes(self, closed, ts=None):
+        ts = ts or time.time()
+        with self._lock:
+            self._advance(ts)
+            if not closed:
+                self._closed_since = None
+            elif self._closed_since is None:
+                self._closed_since = ts
+            self._update(ts)
+
+    def audio(self, active, ts=None):
+        ts = ts or time.time()
+        with self._lock:
+            self._advance(ts)
+            self._audio_active = active
+            self._update(ts)
+
+    def key(self, ts=None):
+        ts = ts or time.time()
+        with self._lock:
+            self._advance(ts)
+            self._keys.append(ts)
+            while self._keys and ts - self._keys[0] > BURST_SECONDS:
+                self._keys.popleft()
+            burst = len(self._keys) > BURST_KEYS
+            if burst and not self._in_burst:
+                self._bursts.add(ts)
+            self._in_burst = burst
+            self._update(ts)
+
+    # Internals (lock held)
+
+    def _advance(self, ts):
+        # Credit the time since the last observation to the state it was in;
+        # frames carry capture time and may arrive slightly out of order
+        if self._last_ts is None:
+            self._last_ts = ts
+        elif ts > self._last_ts:
+            dt = ts - self._last_ts
+            self._elapsed.add(ts, dt)
+            if self._face_count == 0:
+                self._no_face_time.add(ts, dt)
+            if self._audio_active:
+                self._audio_time.add(ts, dt)
+            self._last_ts = ts
+
+    def _update(self, ts):
+        for aggregate in (self._frames, self._face_frames, self._multi_face, self._gaze_away,
+                          self._no_face_time, self._audio_time, self._elapsed, self._bursts):
+            aggregate.expire(ts)
+        elapsed = self._elapsed.sum
+        features = {
+            "no_face_ratio": self._no_face_time.sum / elapsed if elapsed else 0.0,
+            "no_face_streak": ts - self._no_face_since if self._no_face_since is not None else 0.0,
+            "multi_face_ratio": self._multi_face.sum / self._frames.count if self._frames.count else 0.0,
+            "gaze_away_ratio": self._gaze_away.sum / self._face_frames.count if self._face_frames.count else 0.0,
+            "eyes_closed_streak": ts - self._closed_since if self._closed_since is not None else 0.0,
+            "key_bursts": float(self._bursts.count),
+            "audio_ratio": self._audio_time.sum / elapsed if elapsed else 0.0,
+        }
+        total = sum(weight for weight, _ in WEIGHTS.values())
+        score = 100.0 * sum(weight * min(features[name] / full, 1.0)
+                            for name, (weight, full) in WEIGHTS.items()) / total
+        self.features = features
+        self.score = score
+
+        self._check("no_face", features["no_face_streak"] >= NO_FACE_ALERT_SECONDS, ts,
+                    f"No face for {features['no_face_streak']:.1f}s")
+        self._check("multiple_faces", features["multi_face_ratio"] >= MULTI_FACE_ALERT_RATIO
+                    and self._frames.count >= 10, ts,
+                    f"Multiple faces in {features['multi_face_ratio']:.0%} of the last {self.window:.0f}s")
+        self._check("gaze_away", features["gaze_away_ratio"] >= GAZE_AWAY_ALERT_RATIO
+                    and self._face_frames.count >= 10, ts,
+                    f"Looking away {features['gaze_away_ratio']:.0%} of the last {self.window:.0f}s")
+        self._check("eyes_closed", features["eyes_closed_streak"] >= EYES_CLOSED_ALERT_SECONDS, ts,
+                    f"Eyes closed for {features['eyes_closed_streak']:.1f}s")
+        self._check("key_burst", self._in_burst, ts, f"Keystroke burst ({len(self._keys)} keys in {BURST_SECONDS:.0f}s)")
+        self._check("audio", features["audio_ratio"] >= AUDIO_ALERT_RATIO, ts,
+                    f"Audio active {features['audio_ratio']:.0%} of the last {self.window:.0f}s")
+        self._check("high_risk", score >= SCORE_ALERT, ts, f"Risk score {score:.0f}")
+        if self.on_score is not None:
+            self.on_score(score, features)
+
+    def _check(self, kind, condition, ts, message):
+        # One alert per episode: raised once the condition held for `hold`,
+        # re-armed once it stayed clear for `clear`, never within `cooldown`
+        # of the previous alert of the same kind. on_alert runs under the lock
+        # and must not call back in.
+        if not condition:
+            self._pending_since.pop(kind, None)
+            if kind in self._active_alerts:
+                since = self._clear_since.setdefault(kind, ts)
+                if ts - since >= _setting(self.clear, kind):
+                    self._active_alerts.discard(kind)
+                    del self._clear_since[kind]
+            return
+        self._clear_since.pop(kind, None)
+        if kind in self._active_alerts:
+            return
+        since = self._pending_since.setdefault(kind, ts)
+        if ts - since < _setting(self.hold, kind):
+            return
+        last = self._last_alert.get(kind)
+        if last is not None and ts - last < _setting(self.cooldown, kind):
+            return
+        del self._pending_since[kind]
+        self._last_alert[kind] = ts
+        self._active_alerts.add(kind)
+        alert = {"session_id": self.session_id, "kind": kind, "timestamp": ts,
+                 "message": message, "score": round(self.score, 1)}
+        self.alerts.append(alert)
+        if self.on_alert is not None:
+            self.on_alert(alert)
+
+    def status(self):
+        with self._lock:
+            return {"score": round(self.score, 1),
+                    "features": {name: round(value, 3) for name, value in self.features.items()},
+                    "active_alerts": sorted(self._active_alerts)}
@@ -0,0 +1,708 @@
+import threading
+import time
+import os
+import sys
+import uuid
+import itertools
+from datetime import datetime
+import logging
+from lazy import lazy_import
+from camera import open_frame_source, close_frame_source
+from pipeline import Pipeline
+from tracking import FaceTracker
+from detectors import HaarDetector, DlibDetector, CascadeDetector, DLIB_SCALE as DLIB_DEFAULT_SCALE
+from audio import AudioMonitor, WavFileSource
+from recorder import SegmentedRecorder
+from snapshots import MotionSnapshotter
+from supervisor import Supervisor
+from scoring import ScoringEngine
+from monitors import MonitorRegistry, DEFAULT_MONITORS, FACE, GAZE, AUDIO, INPUT, SNAPSHOTS, RECORDING
+from metrics import REGISTRY, stage_timer, counter, histogram, gauge
+from telemetry import get_input_recorder, close_input_recorder
+from eventlog import get_activity_log, close_activity_log, EventBuffer, format_run
+from eventstore import get_event_store
+from storage import get_storage, MAINTENANCE_INTERVAL
+
+cv2 = lazy_import("cv2")
+keyboard = lazy_import("pynput.keyboard")
+mouse = lazy_import("pynput.mouse")
+
+# Monitoring sessions
+# A MonitoringSession holds everything one candidate's monitoring needs: its
+# own stop flag, event buffer, logs, recorder, snapshotter and output
+# directory (SESSIONS_DIR/<session id>, managed by storage.py). What it
+# watches is a set of monitors (see monitors.py) that can be switched on and
+# off while it runs; the camera is only open while face, gaze or recording is
+# on. Sessions are independent of the Tk
+# UI and of each other; a SessionManager runs many of them in one process and
+# can share one detection worker pool (see workers.py) between them.
+
+SESSIONS_DIR = "sessions"
+CAMERA_INDEX = 0
+CAPTURE_SIZE = (320, 240)
+EVENT_FLUSH_INTERVAL = 5  # seconds between flushes of the detection event buffer
+
+# Events of all sessions under one sessions directory go to one indexed SQLite
+# store in it (see eventstore.py); TEXT_LOGS also keeps the old per-session
+# event_log.txt/activity_log.txt
+EVENT_DB_NAME = "events.db"
+
+
+def event_db_path(sessions_dir=SESSIONS_DIR):
+    return os.path.join(sessions_dir, EVENT_DB_NAME)
+
+
+TEXT_LOGS = False
+
+# Face localisation: run the Haar face cascade on every frame, or only every
+# DETECT_EVERY frames and track the faces in between (see tracking.py)
+FACE_TRACKING = True
+DETECT_EVERY = 10
+
+# Scale of the dlib HOG pass when gaze runs without Haar (see detectors.py)
+DLIB_SCALE = DLIB_DEFAULT_SCALE
+
+# Headless mode: no window, no waitKey, no drawing unless the frame is
+# recorded. On by default when there is no display (or EXAM_HEADLESS=1);
+# functionKM.py uses the same default.
+def headless_default():
+    return os.environ.get("EXAM_HEADLESS") == "1" or (
+        sys.platform.startswith("linux") and not os.environ.get("DISPLAY") and not os.environ.get("WAYLAND_DISPLAY"))
+
+
+HEADLESS = headless_default()
+
+# Recording settings (see recorder.py); a new file starts every RECORD_SEGMENT_SECONDS.
+# The frame size comes from the "recording" tier in storage.TIERS.
+RECORD_VIDEO = True
+RECORD_CODEC = "XVID"
+RECORD_FPS = 20.0
+RECORD_SEGMENT_SECONDS = 300
+
+# Audio activity comes from a continuous input stream (see audio.py);
+# set AUDIO_WAV_FILE to replay a recording instead of using the microphone
+AUDIO_WAV_FILE = None
+
+# Keyboard/mouse events go to a compact binary file with downsampled mouse
+# moves (see telemetry.py); set to False to log them as text lines instead
+INPUT_TELEMETRY = True
+
+
+def new_session_id():
+    return f"{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+
+class MonitoringSession:
+    def __init__(self, session_id=None, camera=CAMERA_INDEX, storage=None, headless=None,
+                 monitors=None, audio_wav_file=None, record_video=None,
+                 face_tracking=None, detector_pool=None, status_bridge=None, dlib_scale=None):
+        self.session_id = session_id or new_session_id()
+        # Live status for a UI goes through a StatusBridge (see uibridge.py)
+        self.status_bridge = status_bridge
+        self.camera = camera
+        # The event store lives next to the session directories it describes
+        self.store = get_event_store(event_db_path(storage.root if storage is not None else SESSIONS_DIR))
+        self.storage = storage or get_storage(SESSIONS_DIR, on_delete=self.store.delete_session)
+        self.output_dir = self.storage.activate(self.session_id)
+        self.headless = HEADLESS if headless is None else headless
+        self.audio_wav_file = audio_wav_file or AUDIO_WAV_FILE
+        record_video = RECORD_VIDEO if record_video is None else record_video
+        self.face_tracking = FACE_TRACKING if face_tracking is None else face_tracking
+        self.dlib_scale = DLIB_SCALE if dlib_scale is None else dlib_scale
+        self.detector_pool = detector_pool
+
+        self.stop_flag = threading.Event()
+        self.events = EventBuffer()
+        self.scorer = ScoringEngine(self.session_id, on_alert=self.on_alert)
+        self.activity_log = None
+        if TEXT_LOGS:
+            self.activity_log = get_activity_log(self.path("activity_log.txt"), stop_event=self.stop_flag)
+        self._event_kinds = {}
+        self.input_recorder = None
+        self.audio_monitor = None
+        self.snapshotter = None
+        self.supervisor = None
+        self._listeners = []
+        self._task_ids = itertools.count(1)
+        self._snapshot_task = None
+        self._camera_users = set()
+        self._camera_lock = threading.Lock()
+        self._video_stop = None
+        self._state = None
+        self.state = "created"
+        self.started_at = None
+        self.stopped_at = None
+        self.error = None
+        self.last_event_flush = time.time()
+        self._thread = None
+
+        # Capabilities that can be switched on and off (see monitors.py); the
+        # camera is opened while any of face, gaze or recording is running
+        enabled = set(DEFAULT_MONITORS if monitors is None else monitors)
+        if record_video:
+            enabled.add(RECORDING)
+        self.monitors = MonitorRegistry(enabled)
+        self.monitors.register(FACE, lambda: self.use_camera(FACE), lambda: self.release_camera(FACE),
+                               "Haar face and eye detection")
+        self.monitors.register(GAZE, lambda: self.use_camera(GAZE), lambda: self.release_camera(GAZE),
+                               "dlib landmarks and eye aspect ratio")
+        self.monitors.register(RECORDING, lambda: self.use_camera(RECORDING), lambda: self.release_camera(RECORDING),
+                               "Segmented video recording")
+        self.monitors.register(AUDIO, self.start_audio, self.stop_audio, "Microphone activity")
+        self.monitors.register(INPUT, self.start_listeners, self.stop_listeners, "Keyboard and mouse listeners")
+        self.monitors.register(SNAPSHOTS, self.start_snapshots, self.stop_snapshots, "Motion and alert snapshots")
+
+        labels = {"session": self.session_id}
+        gauge("event_flush_lag_seconds", lambda: time.time() - self.last_event_flush,
+              "Seconds since detection events were last flushed", labels)
+        gauge("queue_depth", self.events.pending, labels={"queue": "events", **labels})
+        gauge("risk_score", lambda: self.scorer.score, "Current suspicion score (0-100)", labels)
+
+    @property
+    def state(self):
+        return self._state
+
+    @state.setter
+    def state(self, value):
+        self._state = value
+        if self.status_bridge is not None:
+            self.status_bridge.publish({"session_id": self.session_id, "state": value}, force=True)
+
+    def path(self, name):
+        return os.path.join(self.output_dir, name)
+
+    # Lifecycle
+
+    def start(self):
+        # Runs the session on its own thread and returns immediately
+        self.state = "starting"
+        self._thread = threading.Thread(target=self.run, name=f"session-{self.session_id}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        # Thread-safe; also wakes the supervisor's event loop
+        if self.supervisor is not None:
+            self.supervisor.stop()
+        else:
+            self.stop_flag.set()
+
+    def set_monitor(self, name, enabled):
+        # Hot toggle from any thread (e.g. a Tk checkbox); applied on the
+        # supervisor's executor so the caller never waits for a device
+        if self.supervisor is None or not self.supervisor.submit(self.monitors.set_enabled, name, enabled):
+            self.monitors.set_enabled(name, enabled)
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return not self.is_alive()
+
+    def is_alive(self):
+        return self.state in ("starting", "running", "stopping")
+
+    def status(self):
+        return {
+            "session_id": self.session_id,
+            "state": self.state,
+            "camera": self.camera,
+            "output_dir": self.output_dir,
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+            "audio_active": self.check_audio(),
+            "risk": self.scorer.status(),
+            "monitors": self.monitors.status(),
+            "error": self.error,
+        }
+
+    def run(self):
+        # Blocking; every task of the session runs under one Supervisor
+        logging.info(f"Starting monitoring session {self.session_id}...")
+        self.state = "starting"
+        self.started_at = time.time()
+
+        supervisor = Supervisor(f"session-{self.session_id}", stop_event=self.stop_flag)
+        supervisor.add_periodic("events", self.flush_events, EVENT_FLUSH_INTERVAL)
+        # Enabled monitors start here and spawn their own tasks (video, snapshots)
+        supervisor.add_service("monitors", self.monitors.activate, self.monitors.deactivate)
+        supervisor.add_periodic("storage", lambda: self.storage.maintain(MAINTENANCE_INTERVAL),
+                                MAINTENANCE_INTERVAL)
+        self.supervisor = supervisor
+
+        try:
+            self.state = "running"
+            supervisor.run()
+            for name, task in supervisor.status().items():
+                if name.startswith("video") and task["state"] == "failed":
+                    self.error = task["error"]
+        except Exception as e:
+            logging.error(f"Error in monitoring session {self.session_id}: {e}")
+            self.error = str(e)
+        finally:
+            self.state = "stopping"
+            self.stop_flag.set()
+            self.flush_events()
+            if self.input_recorder is not None:
+                close_input_recorder(self.input_recorder.path)
+            if self.detector_pool is not None:
+                self.detector_pool.remove_stream(self.session_id)
+            self.store.flush()
+            self.storage.deactivate(self.session_id)
+            if self.activity_log is not None:
+                close_activity_log(self.activity_log.path)
+            REGISTRY.remove_labelled("session", self.session_id)
+            self.stopped_at = time.time()
+            self.state = "failed" if self.error else "stopped"
+            logging.info(f"Monitoring session {self.session_id} stopped.")
+
+    # Events
+
+    def add_event(self, event, kind="detection"):
+        # Per-frame events are coalesced in the buffer before they reach the store
+        self._event_kinds[event] = kind
+        self.events.add(event)
+
+    def log_event(self, text, kind="activity", data=None):
+        self.store.add(self.session_id, kind, text, data=data)
+        if self.activity_log is not None:
+            self.activity_log.log(text)
+
+    def on_alert(self, alert):
+        counter("alerts_total", "Alerts raised by the scoring engine", {"kind": alert["kind"]}).inc()
+        self.log_event(f"Alert: {alert['message']} (risk {alert['score']:.0f})", "alert", alert)
+        self.snapshot_alert(alert["message"])
+
+    def flush_events(self):
+        start = time.perf_counter()
+        runs, dropped = self.events.take()
+        for text, count, first, last in runs:
+            self.store.add(self.session_id, self._event_kinds.get(text, "detection"), text,
+                           first, count, last)
+        if dropped:
+            self.store.add(self.session_id, "dropped", f"{dropped} events dropped (buffer full)", count=dropped)
+        if TEXT_LOGS:
+            lines = [format_run(run) for run in runs]
+            if dropped:
+                now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                lines.append(f"[{now}] {dropped} events dropped (buffer full)")
+            if lines:
+                with open(self.path("event_log.txt"), "a", encoding="utf-8") as file:
+                    file.write("\n".join(lines) + "\n")
+        if dropped:
+            counter("events_dropped_total", "Events lost because the buffer was full").inc(dropped)
+        histogram("event_flush_seconds", "Time to write one batch of events").observe(time.perf_counter() - start)
+        self.last_event_flush = time.time()
+
+    # Audio
+
+    def on_audio_change(self, active, level):
+        self.scorer.audio(active)
+        self.add_event("Audio activity started" if active else "Audio activity stopped", "audio")
+
+    def start_audio(self):
+        try:
+            source = WavFileSource(self.audio_wav_file, realtime=True) if self.audio_wav_file else None
+            self.audio_monitor = AudioMonitor(source=source, on_change=self.on_audio_change)
+            self.audio_monitor.start()
+        except Exception as e:
+            print(f"Audio error: {e}")
+            self.log_event(f"Audio error: {e}", "error")
+            self.audio_monitor = None
+
+    def stop_audio(self):
+        if self.audio_monitor is not None:
+            self.audio_monitor.stop()
+
+    def check_audio(self):
+        return self.audio_monitor is not None and self.audio_monitor.is_active()
+
+    # Keyboard and mouse
+
+    def on_key_press(self, key):
+        self.scorer.key()
+        if self.input_recorder is not None:
+            self.input_recorder.key(key)
+        else:
+            try:
+                self.log_event(f"Key: {key.char}", "input")
+            except AttributeError:
+                self.log_event(f"Special Key: {key}", "input")
+        if key == keyboard.Key.esc:
+            self.stop()
+            return False
+
+    def on_mouse_move(self, x, y):
+        if self.input_recorder is not None:
+            self.input_recorder.move(x, y)
+        else:
+            self.log_event(f"Mouse moved to ({x}, {y})", "input")
+
+    def on_mouse_click(self, x, y, button, pressed):
+        if self.input_recorder is not None:
+            self.input_recorder.click(x, y, button, pressed)
+            return
+        action = "Pressed" if pressed else "Released"
+        self.log_event(f"Mouse {action} {button} at ({x}, {y})", "input")
+
+    def on_mouse_scroll(self, x, y, dx, dy):
+        if self.input_recorder is not None:
+            self.input_recorder.scroll(x, y, dx, dy)
+        else:
+            self.log_event(f"Mouse scroll at ({x}, {y}) by ({dx}, {dy})", "input")
+
+    def start_listeners(self):
+        try:
+            if INPUT_TELEMETRY:
+                self.input_recorder = get_input_recorder(self.path("input_telemetry.bin"))
+            kb_listener = keyboard.Listener(on_press=self.on_key_press)
+            ms_listener = mouse.Listener(
+                on_move=self.on_mouse_move,
+                on_click=self.on_mouse_click,
+                on_scroll=self.on_mouse_scroll
+            )
+            kb_listener.start()
+            ms_listener.start()
+            self._listeners = [kb_listener, ms_listener]
+            print("Input listeners started successfully")
+
+        except Exception as e:
+            print(f"Listener error: {e}")
+            self.log_event(f"Listener error: {e}", "error")
+
+    def stop_listeners(self):
+        for listener in self._listeners:
+            listener.stop()
+        self._listeners = []
+
+    # Snapshots are taken when the picture changes or a detector raises an
+    # alert, not on a timer (see snapshots.py)
+
+    def on_snapshot_saved(self, filename, reason):
+        print(f"✅ Snapshot saved as {filename} ({reason})")
+        self.log_event(f"Snapshot taken: {filename} ({reason})", "snapshot",
+                       {"file": filename, "reason": reason})
+
+    def snapshot_alert(self, reason):
+        if self.snapshotter is not None:
+            self.snapshotter.trigger(reason)
+
+    def save_snapshot(self, frame, timestamp, alert):
+        # Alert snapshots use the sharper "alert" tier (see storage.TIERS)
+        return self.storage.save_image(self.session_id, frame, "alert" if alert else "snapshot", timestamp)
+
+    def start_snapshots(self):
+        self._snapshot_task = f"snapshots-{next(self._task_ids)}"
+        self.supervisor.spawn(self._snapshot_task, self.take_snapshots, restart=True)
+
+    def stop_snapshots(self):
+        self.supervisor.cancel(self._snapshot_task)
+        self.snapshotter = None
+
+    async def take_snapshots(self):
+        # Snapshots copy frames from the shared camera instead of re-opening it;
+        # each sample is a short executor call, so no thread sleeps in between
+        supervisor = self.supervisor
+        source = await supervisor.call(open_frame_source, self.camera, *CAPTURE_SIZE)
+        if source is None:
+            self.log_event("Snapshot failed: camera not available", "error")
+            raise RuntimeError(f"Cannot open camera {self.camera}")
+
+        try:
+            self.snapshotter = MotionSnapshotter(source, on_saved=self.on_snapshot_saved,
+                                                 writer=self.save_snapshot)
+            while source.is_running():
+                await supervisor.call(self.snapshotter.sample)
+                if await supervisor.wait(self.snapshotter.sample_interval):
+                    return
+        finally:
+            close_frame_source(source)
+        # The camera went away; raising lets the supervisor restart snapshots
+        raise RuntimeError(f"Camera {self.camera} stopped")
+
+    # Video
+
+    def use_camera(self, user):
+        # Starts the video task for the first camera user
+        with self._camera_lock:
+            self._camera_users.add(user)
+            if self._video_stop is None:
+                video_stop = self._video_stop = threading.Event()
+
+                async def run_video():
+                    await self.supervisor.call(self.video_loop, video_stop)
+                self.supervisor.spawn(f"video-{next(self._task_ids)}", run_video, restart=True)
+
+    def release_camera(self, user):
+        # Stops the video task (and closes the camera) after the last user
+        with self._camera_lock:
+            self._camera_users.discard(user)
+            if not self._camera_users and self._video_stop is not None:
+                self._video_stop.set()
+                self._video_stop = None
+
+    def video_loop(self, video_stop):
+        # One detector per monitor combination; the cascade reuses the Haar and
+        # dlib detectors, so dlib models load only once gaze is switched on
+        haar = HaarDetector()
+        if self.face_tracking and self.detector_pool is None:
+            haar.tracker = FaceTracker(haar.find_faces, DETECT_EVERY)
+        dlib_detector = DlibDetector(self.dlib_scale)
+        detectors = {"haar": haar, "dlib": dlib_detector, "cascade": CascadeDetector(haar, dlib_detector)}
+
+        source = open_frame_source(self.camera, *CAPTURE_SIZE)
+        if source is None:
+            raise RuntimeError(f"Cannot open camera {self.camera}")
+
+        recorder = None
+        monitors = self.monitors
+        stop_flag = self.stop_flag
+        headless = self.headless
+        pool = self.detector_pool
+        last_seq = -1
+        last_detection = {"faces": [], "eyes": [], "looking_out": 0, "closed": False}
+
+        def stopped():
+            return stop_flag.is_set() or video_stop.is_set()
+
+        # Capture, detect, annotate and encode run as separate pipeline stages so
+        # a slow detector does not lower the recording frame rate
+        def capture():
+            nonlocal last_seq
+            ref = source.acquire(after_seq=last_seq)
+            if ref is None:
+                return None
+            last_seq = ref.seq
+            # The slot is shared with other consumers, so work on a private copy
+            with ref, stage_timer("capture"):
+                return {"frame": ref.frame.copy(), "seq": ref.seq, "timestamp": ref.timestamp}
+
+        def detect_local(packet, kind):
+            return detectors[kind].detect([packet["frame"]])[0]
+
+        def detect_pooled(packet, kind):
+            # Hand the frame to the shared worker pool and use the newest
+            # result it has for this session (it may lag a few frames)
+            pool.add_stream(self.session_id, packet["frame"].shape)
+            pool.submit(self.session_id, packet["frame"], packet["timestamp"], kind)
+            latest = pool.latest(self.session_id)
+            if latest is None or "error" in latest[2]:
+                return {**last_detection, "closed": [True] if last_detection["closed"] else []}
+            return latest[2]
+
+        def detect(packet):
+            # Only the detectors of running monitors do any work
+            face_on, gaze_on = monitors.is_running(FACE), monitors.is_running(GAZE)
+            if not face_on and not gaze_on:
+                packet.update(faces=[], eyes=[], looking_out=0)
+                publish_status()
+                return packet
+            # Face and gaze together run as a cascade: dlib landmarks only
+            # inside the faces Haar found
+            kind = "cascade" if face_on and gaze_on else "haar" if face_on else "dlib"
+            result = detect_pooled(packet, kind) if pool is not None else detect_local(packet, kind)
+            closed = False
+            if gaze_on:
+                closed = bool(result.get("closed")) and all(result["closed"])
+                self.scorer.eyes(closed, packet["timestamp"])
+                if closed:
+                    self.add_event("Eyes closed")
+            faces, looking_out = result["faces"], result.get("looking_out", 0)
+            self.scorer.frame(len(faces), looking_out, packet["timestamp"])
+            for _ in faces:
+                self.add_event("Face detected")
+            for _ in result.get("eyes", []):
+                self.add_event("Eye detected")
+
+            # Alert snapshots on changes of the situation, not on every frame
+            if len(faces) == 0 and len(last_detection["faces"]) > 0:
+                self.snapshot_alert("No face")
+            elif len(faces) > 1 and len(last_detection["faces"]) <= 1:
+                self.snapshot_alert("Multiple faces")
+            elif looking_out > 0 and last_detection["looking_out"] == 0:
+                self.snapshot_alert("Looking away")
+            elif closed and not last_detection["closed"]:
+                self.snapshot_alert("Eyes closed")
+
+            last_detection.update(faces=faces, eyes=result.get("eyes", []), looking_out=looking_out, closed=closed)
+            packet.update(last_detection)
+            publish_status()
+            return packet
+
+        fps_window = [time.monotonic(), 0, 0.0]  # window start, frames, fps
+
+        def publish_status():
+            fps_window[1] += 1
+            now = time.monotonic()
+            if now - fps_window[0] >= 1.0:
+                fps_window[2] = fps_window[1] / (now - fps_window[0])
+                fps_window[0], fps_window[1] = now, 0
+            bridge = self.status_bridge
+            if bridge is None or not bridge.due():
+                return
+            bridge.publish({
+                "session_id": self.session_id,
+                "state": self.state,
+                "faces": len(last_detection["faces"]),
+                "eyes": len(last_detection["eyes"]),
+                "away": last_detection["looking_out"],
+                "audio": self.check_audio(),
+                "fps": round(fps_window[2], 1),
+                "risk": round(self.scorer.score, 1),
+            })
+
+        def reuse_detection(packet):
+            # Detector is behind: keep the frame and carry over the latest results
+            packet.update(last_detection)
+            return packet
+
+        def annotate(packet):
+            # Drawing is only needed for the window or the recording
+            if headless and not monitors.is_running(RECORDING):
+                return packet
+            with stage_timer("annotate"):
+                return draw_overlay(packet)
+
+        def draw_overlay(packet):
+            frame = packet["frame"]
+            for (x, y, w, h) in packet["faces"]:
+                cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2)
+            for (ex, ey, ew, eh) in packet["eyes"]:
+                cv2.rectangle(frame, (ex, ey), (ex + ew, ey + eh), (0, 255, 0), 2)
+            cv2.putText(frame, f"Faces: {len(packet['faces'])} | Eyes: {len(packet['eyes'])} | Audio: {'Yes' if self.check_audio() else 'No'} | Away: {packet['looking_out']}",
+                        (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+            return packet
+
+        def encode(packet):
+            # The recorder follows the recording monitor: created when it is
+            # switched on, finished (segment closed) when it is switched off
+            nonlocal recorder
+            if not monitors.is_running(RECORDING):
+                if recorder is not None:
+                    recorder.stop()
+                    recorder = None
+                return packet
+            if recorder is None:
+                record_size = self.storage.tiers["recording"]["max_size"]
+                recorder = SegmentedRecorder("recording", RECORD_CODEC, RECORD_FPS, record_size,
+                                             RECORD_SEGMENT_SECONDS, directory=self.output_dir)
+                recorder.start()
+            with stage_timer("encode"):
+                recorder.write(packet["frame"], packet["timestamp"])
+            return packet
+
+        labels = {"session": self.session_id}
+        pipeline = Pipeline(keep_output=not headless)
+        pipeline.set_source("capture", capture)
+        pipeline.add_stage("detect", detect, skip=reuse_detection)
+        pipeline.add_stage("annotate", annotate)
+        pipeline.add_stage("encode", encode)
+        gauge("queue_depth", lambda: recorder.queue_depth() if recorder is not None else 0,
+              labels={"queue": "encoder", **labels})
+        pipeline.start()
+        pipeline.export_metrics(labels)
+
+        try:
+            if headless:
+                print("Video monitoring started (headless). Stop with ESC, SIGINT or SIGTERM.")
+                while not stopped() and source.is_running():
+                    video_stop.wait(0.5)
+            else:
+                print("Video monitoring started. Press 'q' or ESC to quit.")
+
+                # Display stays on one thread; HighGUI is not thread-safe
+                window = f"Monitor {self.session_id}"
+                while not stopped() and source.is_running():
+                    packet = pipeline.get_output()
+                    if packet is not None:
+                        with stage_timer("display"):
+                            cv2.imshow(window, packet["frame"])
+
+                    key = cv2.waitKey(1) & 0xFF
+                    if key in [27, ord('q')]:
+                        self.stop()
+                        break
+        finally:
+            pipeline.stop()
+            logging.info(f"Video pipeline stats ({self.session_id}): {pipeline.stats()}")
+            close_frame_source(source)
+            if recorder is not None:
+                recorder.stop()
+                logging.info(f"Recorder stats ({self.session_id}): {recorder.stats()}")
+            if not headless:
+                cv2.destroyAllWindows()
+
+        if not stopped():
+            # The camera went away; the supervisor restarts the video task
+            raise RuntimeError(f"Camera {self.camera} stopped")
+
+
+class SessionManager:
+    # Runs many sessions in one process. With shared_detection, all sessions
+    # send frames to one DetectionPool instead of running Haar on their own
+    # pipeline threads. Manager sessions default to headless and no local
+    # keyboard/mouse listeners, since those belong to the server machine.
+    def __init__(self, shared_detection=True, workers=None, sessions_dir=SESSIONS_DIR):
+        self.shared_detection = shared_detection
+        self.workers = workers
+        # Retention and quota deletions also drop the session's event rows
+        self.store = get_event_store(event_db_path(sessions_dir))
+        self.storage = get_storage(sessions_dir, on_delete=self.store.delete_session)
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _detector_pool(self):
+        if self.shared_detection and self._pool is None:
+            from workers import DetectionPool
+            self._pool = DetectionPool(("haar",), workers=self.workers)
+        return self._pool
+
+    def start_session(self, session_id=None, camera=CAMERA_INDEX, **options):
+        options.setdefault("headless", True)
+        # Global input listeners cannot tell sessions apart, so they are off here
+        options.setdefault("monitors", [name for name in DEFAULT_MONITORS if name != INPUT])
+        session_id = session_id or new_session_id()
+        with self._lock:
+            existing = self._sessions.get(session_id)
+            if existing is not None and existing.is_alive():
+                raise ValueError(f"Session {session_id} is already running")
+            session = MonitoringSession(session_id, camera, self.storage,
+                                        detector_pool=self._detector_pool(), **options)
+            self._sessions[session_id] = session
+        return session.start()
+
+    def stop_session(self, session_id, timeout=10):
+        session = self.get(session_id)
+        session.stop()
+        return session.join(timeout)
+
+    def get(self, session_id):
+        with self._lock:
+            if session_id not in self._sessions:
+                raise KeyError(f"Unknown session {session_id}")
+            return self._sessions[session_id]
+
+    def sessions(self):
+        with self._lock:
+            return [session.status() for session in self._sessions.values()]
+
+    def prune(self):
+        # Forget sessions that have finished
+        with self._lock:
+            for session_id in [key for key, session in self._sessions.items() if not session.is_alive()]:
+                del self._sessions[session_id]
+
+    def stop_all(self, timeout=10):
+        with self._lock:
+            sessions = list(self._sessions.values())
+        for session in sessions:
+            session.stop()
+        deadline = time.monotonic() + timeout
+        for session in sessions:
+            session.join(max(0.0, deadline - time.monotonic()))
+
+    def close(self, timeout=10):
+        self.stop_all(timeout)
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
@@ -0,0 +1,122 @@
+import collections
+import logging
+import os
+import threading
+import time
+
+from lazy import lazy_import
+
+cv2 = lazy_import("cv2")
+
+# Motion-gated snapshots
+# Instead of writing a JPEG on a fixed timer, the shared camera stream is
+# sampled every SAMPLE_INTERVAL seconds, downscaled to MOTION_SIZE and
+# compared with the previous sample. A snapshot is saved when the fraction of
+# changed pixels crosses MOTION_THRESHOLD, or when a detector calls trigger()
+# (e.g. "No face"). Motion snapshots are at least MIN_INTERVAL seconds apart;
+# all snapshots together are capped at MAX_PER_MINUTE.
+
+SAMPLE_INTERVAL = 0.25
+MOTION_SIZE = (64, 48)
+PIXEL_DELTA = 25          # grey-level change that counts a pixel as changed
+MOTION_THRESHOLD = 0.08   # fraction of changed pixels
+MIN_INTERVAL = 5.0
+MAX_PER_MINUTE = 6
+JPEG_QUALITY = 90
+
+
+class MotionSnapshotter:
+    def __init__(self, source, threshold=MOTION_THRESHOLD, min_interval=MIN_INTERVAL,
+                 max_per_minute=MAX_PER_MINUTE, sample_interval=SAMPLE_INTERVAL,
+                 jpeg_quality=JPEG_QUALITY, prefix="snapshot", on_saved=None, writer=None):
+        self.source = source
+        self.threshold = threshold
+        self.min_interval = min_interval
+        self.max_per_minute = max_per_minute
+        self.sample_interval = sample_interval
+        self.jpeg_quality = jpeg_quality
+        self.prefix = prefix
+        self.on_saved = on_saved
+        # writer(frame, timestamp, alert) -> filename replaces the built-in
+        # JPEG writer (e.g. StorageManager.save_image with quality tiers)
+        self.writer = writer
+        self._previous = None
+        self._last_seq = -1
+        self._alert = None
+        self._lock = threading.Lock()
+        self._last_save = 0.0
+        self._recent = collections.deque()
+        self.saved = 0
+        self.suppressed = 0
+
+    def trigger(self, reason):
+        # Called from detector threads; the next sample is saved if the rate cap allows
+        with self._lock:
+            self._alert = reason
+
+    def motion_score(self, frame):
+        small = cv2.resize(frame, MOTION_SIZE, interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        previous, self._previous = self._previous, gray
+        if previous is None:
+            return 0.0
+        changed = cv2.absdiff(gray, previous) > PIXEL_DELTA
+        return float(changed.mean())
+
+    def _allowed(self, now, alert):
+        while self._recent and now - self._recent[0] > 60:
+            self._recent.popleft()
+        if len(self._recent) >= self.max_per_minute:
+            return False
+        return alert or now - self._last_save >= self.min_interval
+
+    def sample(self):
+        # One sampling step: compare the newest frame with the last sample and
+        # save it if it moved or an alert is pending. Returns quickly.
+        ref = self.source.acquire(after_seq=self._last_seq, timeout=0)
+        if ref is None:
+            return
+        with ref:
+            self._last_seq = ref.seq
+            timestamp = ref.timestamp
+            score = self.motion_score(ref.frame)
+            with self._lock:
+                alert, self._alert = self._alert, None
+            if alert is None and score < self.threshold:
+                return
+            if not self._allowed(time.time(), alert is not None):
+                self.suppressed += 1
+                return
+            frame = ref.frame.copy()
+        self._save(frame, timestamp, alert or f"motion {score:.2f}", alert is not None)
+
+    def run(self, stop_event):
+        while not stop_event.is_set() and self.source.is_running():
+            stop_event.wait(self.sample_interval)
+            self.sample()
+
+    def _save(self, frame, timestamp, reason, alert=False):
+        try:
+            if self.writer is not None:
+                filename = self.writer(frame, timestamp, alert)
+            else:
+                filename = self._filename(timestamp)
+                cv2.imwrite(filename, frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        except Exception as e:
+            logging.error(f"Snapshot error: {e}")
+            return
+        now = time.time()
+        self._last_save = now
+        self._recent.append(now)
+        self.saved += 1
+        if self.on_saved is not None:
+            self.on_saved(filename, reason)
+
+    def _filename(self, timestamp):
+        # Millisecond stamp, plus a counter if that name is taken
+        stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(timestamp))
+        base = f"{self.prefix}_{stamp}_{int(timestamp * 1000) % 1000:03d}"
+        filename, n = f"{base}.jpg", 1
+        while os.path.exists(filename):
+            filename, n = f"{base}_{n}.jpg", n + 1
+        return filename
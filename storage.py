@@ -0,0 +1,267 @@
+import gzip
+import logging
+import os
+import shutil
+import threading
+import time
+
+from lazy import lazy_import
+from metrics import counter, gauge
+
+cv2 = lazy_import("cv2")
+
+# Session storage
+# Every artifact lives under ROOT/<session id>/ with a millisecond timestamp in
+# its name (plus a counter on collision), so two snapshots in the same second
+# no longer overwrite each other. Images are encoded per artifact tier (JPEG
+# quality and maximum size). maintain(), run periodically, keeps the disk
+# bounded:
+#   compaction - sessions finished more than COMPACT_AFTER seconds ago get
+#                their text/CSV logs gzipped and their motion snapshots shrunk
+#                to thumbnails (once; a marker file records it). Alert images
+#                are the evidence a proctor reviews and keep full quality.
+#   retention  - finished sessions older than RETENTION_DAYS are deleted
+#   quota      - while ROOT is above QUOTA_BYTES, recordings and then whole
+#                sessions are deleted, oldest finished session first
+# Running sessions are never compacted or deleted.
+
+ROOT = "sessions"
+QUOTA_BYTES = 20 * 1024 ** 3
+RETENTION_DAYS = 30
+COMPACT_AFTER = 3600
+MAINTENANCE_INTERVAL = 300
+COMPACTED_MARKER = ".compacted"
+
+# Artifact -> encode settings; max_size None keeps the frame size
+TIERS = {
+    "snapshot": {"quality": 80, "max_size": (640, 480)},   # motion snapshots
+    "alert": {"quality": 92, "max_size": None},           # detector alerts, kept sharp
+    "thumbnail": {"quality": 60, "max_size": (160, 120)},  # compacted snapshots
+    "recording": {"quality": None, "max_size": (320, 240)},
+}
+
+LOG_SUFFIXES = (".txt", ".csv", ".log")
+IMAGE_SUFFIXES = (".jpg", ".jpeg")
+FULL_QUALITY_TIERS = ("alert",)  # never thumbnailed by compaction
+RECORDING_SUFFIXES = (".avi", ".mp4")
+
+
+def _dir_size(path):
+    total = 0
+    for folder, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(folder, name))
+            except OSError:
+                pass
+    return total
+
+
+def _dir_mtime(path):
+    # Newest file in the tree (the directory itself changes on compaction)
+    latest = None
+    for folder, _, files in os.walk(path):
+        for name in files:
+            try:
+                mtime = os.path.getmtime(os.path.join(folder, name))
+            except OSError:
+                continue
+            latest = mtime if latest is None else max(latest, mtime)
+    return latest if latest is not None else os.path.getmtime(path)
+
+
+class StorageManager:
+    def __init__(self, root=ROOT, quota_bytes=QUOTA_BYTES, retention_days=RETENTION_DAYS,
+                 compact_after=COMPACT_AFTER, tiers=None, on_delete=None):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.retention_days = retention_days
+        self.compact_after = compact_after
+        self.tiers = dict(TIERS, **(tiers or {}))
+        # on_delete(session_id) runs after a session directory was removed
+        self.on_delete = on_delete
+        self._active = set()
+        self._lock = threading.Lock()
+        self._maintenance_lock = threading.Lock()
+        self._last_maintenance = 0.0
+        self.bytes_used = 0
+        os.makedirs(root, exist_ok=True)
+        gauge("storage_bytes", lambda: self.bytes_used, "Bytes used under the sessions directory")
+
+    # Sessions
+
+    def session_dir(self, session_id):
+        path = os.path.join(self.root, session_id)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def activate(self, session_id):
+        with self._lock:
+            self._active.add(session_id)
+        return self.session_dir(session_id)
+
+    def deactivate(self, session_id):
+        with self._lock:
+            self._active.discard(session_id)
+
+    def _finished_sessions(self):
+        # [(last modification time, session id, path)] of inactive sessions, oldest first
+        with self._lock:
+            active = set(self._active)
+        sessions = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if os.path.isdir(path) and name not in active:
+                sessions.append((_dir_mtime(path), name, path))
+        return sorted(sessions)
+
+    # Artifacts
+
+    def unique_path(self, session_id, kind, suffix, timestamp=None):
+        timestamp = timestamp or time.time()
+        stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(timestamp))
+        base = os.path.join(self.session_dir(session_id), f"{kind}_{stamp}_{int(timestamp * 1000) % 1000:03d}")
+        with self._lock:
+            path, n = f"{base}{suffix}", 1
+            while os.path.exists(path):
+                path, n = f"{base}_{n}{suffix}", n + 1
+            # Reserve the name before releasing the lock
+            open(path, "wb").close()
+        return path
+
+    def encode(self, frame, tier):
+        settings = self.tiers[tier]
+        max_size = settings["max_size"]
+        if max_size is not None:
+            height, width = frame.shape[:2]
+            scale = min(max_size[0] / width, max_size[1] / height)
+            if scale < 1:
+                frame = cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+        ok, data = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, settings["quality"]])
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        return data.tobytes()
+
+    def save_image(self, session_id, frame, tier="snapshot", timestamp=None):
+        path = self.unique_path(session_id, tier, ".jpg", timestamp)
+        data = self.encode(frame, tier)
+        with open(path, "wb") as file:
+            file.write(data)
+        counter("artifact_bytes_total", "Bytes written per artifact tier", {"tier": tier}).inc(len(data))
+        return path
+
+    # Maintenance
+
+    def maintain(self, min_interval=0):
+        # Every session may schedule this; concurrent or too frequent calls return at once
+        if not self._maintenance_lock.acquire(blocking=False):
+            return
+        if time.time() - self._last_maintenance < min_interval:
+            self._maintenance_lock.release()
+            return
+        try:
+            self.compact()
+            self.apply_retention()
+            self.apply_quota()
+        except Exception as e:
+            logging.error(f"Storage maintenance failed: {e}")
+        finally:
+            self._last_maintenance = time.time()
+            self._maintenance_lock.release()
+
+    def compact(self):
+        now = time.time()
+        for mtime, session_id, path in self._finished_sessions():
+            marker = os.path.join(path, COMPACTED_MARKER)
+            if now - mtime < self.compact_after or os.path.exists(marker):
+                continue
+            saved = 0
+            for folder, _, files in os.walk(path):
+                for name in files:
+                    file_path = os.path.join(folder, name)
+                    try:
+                        if name.endswith(LOG_SUFFIXES):
+                            saved += self._gzip(file_path)
+                        elif (name.endswith(IMAGE_SUFFIXES)
+                              and not name.startswith(tuple(f"{tier}_" for tier in FULL_QUALITY_TIERS))):
+                            saved += self._thumbnail(file_path)
+                    except Exception as e:
+                        logging.warning(f"Could not compact {file_path}: {e}")
+            open(marker, "w").close()
+            # Keep the session's age: compaction is not activity
+            for folder, _, files in os.walk(path):
+                for name in files:
+                    os.utime(os.path.join(folder, name), (mtime, mtime))
+            logging.info(f"Compacted session {session_id}: {saved / 1024 ** 2:.1f} MB saved")
+
+    def _gzip(self, path):
+        before = os.path.getsize(path)
+        with open(path, "rb") as source, gzip.open(path + ".gz", "wb") as target:
+            shutil.copyfileobj(source, target)
+        os.remove(path)
+        return before - os.path.getsize(path + ".gz")
+
+    def _thumbnail(self, path):
+        before = os.path.getsize(path)
+        frame = cv2.imread(path)
+        if frame is None:
+            return 0
+        data = self.encode(frame, "thumbnail")
+        if len(data) >= before:
+            return 0
+        with open(path, "wb") as file:
+            file.write(data)
+        return before - len(data)
+
+    def _delete_session(self, session_id, path, reason):
+        shutil.rmtree(path, ignore_errors=True)
+        counter("sessions_deleted_total", "Session directories removed by retention or quota").inc()
+        logging.info(f"Deleted session {session_id} ({reason})")
+        if self.on_delete is not None:
+            self.on_delete(session_id)
+
+    def apply_retention(self):
+        if not self.retention_days:
+            return
+        cutoff = time.time() - self.retention_days * 86400
+        for mtime, session_id, path in self._finished_sessions():
+            if mtime < cutoff:
+                self._delete_session(session_id, path, "retention")
+
+    def apply_quota(self):
+        self.bytes_used = _dir_size(self.root)
+        if not self.quota_bytes or self.bytes_used <= self.quota_bytes:
+            return
+        sessions = self._finished_sessions()
+        # Recordings are the bulk of the data: drop those first, oldest first
+        for _, session_id, path in sessions:
+            for name in os.listdir(path):
+                if name.endswith(RECORDING_SUFFIXES):
+                    file_path = os.path.join(path, name)
+                    self.bytes_used -= os.path.getsize(file_path)
+                    os.remove(file_path)
+                    logging.info(f"Deleted {file_path} (quota)")
+            if self.bytes_used <= self.quota_bytes:
+                return
+        for _, session_id, path in sessions:
+            self.bytes_used -= _dir_size(path)
+            self._delete_session(session_id, path, "quota")
+            if self.bytes_used <= self.quota_bytes:
+                return
+        logging.warning(f"Storage above quota with only running sessions left: {self.bytes_used / 1024 ** 3:.1f} GB")
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_storage(root=ROOT, on_delete=None, **options):
+    # One manager per root directory, shared by all sessions in the process
+    with _managers_lock:
+        manager = _managers.get(root)
+        if manager is None:
+            manager = StorageManager(root, on_delete=on_delete, **options)
+            _managers[root] = manager
+        elif on_delete is not None and manager.on_delete is None:
+            manager.on_delete = on_delete
+        return manager
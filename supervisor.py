@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import counter
+
+# Task supervisor
+# Runs a session's monitoring tasks on one asyncio event loop instead of a set
+# of threads that each sleep and poll a stop flag:
+#   add_periodic  - call a short blocking function every `interval` seconds
+#   add_blocking  - run a long blocking loop (OpenCV/dlib) in the executor; it
+#                   must return soon after `stop_event` is set
+#   add_service   - start something that runs on its own (audio stream, input
+#                   listeners), then stop it when the supervisor stops
+# Blocking calls go to a thread pool so the loop itself never blocks. A task
+# that raises is restarted with exponential back-off up to MAX_RESTARTS times;
+# a task that ran for RESET_AFTER seconds before failing starts counting anew,
+# so occasional hiccups over a long session do not use up its restarts. Tasks
+# that must keep running (e.g. the snapshot loop) raise when they lose their
+# input instead of returning, since a normal return means "done".
+# Tasks can also be spawned and cancelled while the loop runs (spawn/cancel,
+# from any thread). When a critical task ends, or stop() is called from any
+# thread, every task is told to stop; anything still running after
+# SHUTDOWN_TIMEOUT seconds is cancelled and left behind instead of holding up
+# shutdown.
+
+SHUTDOWN_TIMEOUT = 5.0
+RESTART_DELAY = 1.0
+MAX_RESTARTS = 3
+RESET_AFTER = 60.0
+
+
+class _Task:
+    def __init__(self, name, run, restart, critical):
+        self.name = name
+        self.run = run
+        self.restart = restart
+        self.critical = critical
+        self.restarts = 0
+        self.state = "pending"
+        self.error = None
+
+
+class Supervisor:
+    def __init__(self, name="supervisor", stop_event=None, shutdown_timeout=SHUTDOWN_TIMEOUT,
+                 restart_delay=RESTART_DELAY, max_restarts=MAX_RESTARTS, max_workers=None):
+        self.name = name
+        # Blocking code watches this threading.Event; it is set when stopping
+        self.stop_event = stop_event or threading.Event()
+        self.shutdown_timeout = shutdown_timeout
+        self.restart_delay = restart_delay
+        self.max_restarts = max_restarts
+        self.max_workers = max_workers
+        self._tasks = []
+        self._running = {}
+        self._loop = None
+        self._stopping = None
+        self._executor = None
+
+    # Registration
+
+    def add_task(self, name, coro_func, restart=False, critical=False):
+        # coro_func() returns a coroutine; the generic form of the helpers below
+        self._tasks.append(_Task(name, coro_func, restart, critical))
+
+    def add_periodic(self, name, func, interval, final=False, restart=True):
+        # final=True calls func once more after stopping (e.g. a last flush)
+        async def run():
+            while not self._stopping.is_set():
+                await self.call(func)
+                if await self.wait(interval):
+                    break
+            if final:
+                await self.call(func)
+        self.add_task(name, run, restart)
+
+    def add_blocking(self, name, func, restart=False, critical=True):
+        async def run():
+            await self.call(func)
+        self.add_task(name, run, restart, critical)
+
+    def add_service(self, name, start, stop, restart=False):
+        async def run():
+            await self.call(start)
+            try:
+                await self._stopping.wait()
+            finally:
+                await asyncio.shield(self.call(stop))
+        self.add_task(name, run, restart)
+
+    def spawn(self, name, coro_func, restart=False, critical=False):
+        # Like add_task, but also works while running (from any thread)
+        task = _Task(name, coro_func, restart, critical)
+        loop = self._loop
+        if loop is None:
+            self._tasks.append(task)
+            return
+        loop.call_soon_threadsafe(self._start, task)
+
+    def cancel(self, name):
+        # Cancels a running task; blocking executor work must also be told to stop
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._cancel, name)
+
+    def submit(self, func, *args):
+        # Runs func in the executor without waiting; False if the loop is not running
+        loop = self._loop
+        if loop is None:
+            return False
+        asyncio.run_coroutine_threadsafe(self.call(func, *args), loop)
+        return True
+
+    def _start(self, task):
+        if task.name in self._running and not self._running[task.name].done():
+            return
+        self._tasks.append(task)
+        self._running[task.name] = asyncio.create_task(self._supervise(task), name=task.name)
+
+    def _cancel(self, name):
+        future = self._running.get(name)
+        if future is not None:
+            future.cancel()
+
+    # Helpers for tasks
+
+    async def call(self, func, *args):
+        return await self._loop.run_in_executor(self._executor, func, *args)
+
+    async def wait(self, timeout):
+        # Sleeps up to timeout; True as soon as the supervisor is stopping
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self._stopping.is_set()
+
+    # Lifecycle
+
+    def stop(self):
+        # Safe to call from any thread, including executor threads
+        self.stop_event.set()
+        loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._stopping.set)
+            except RuntimeError:
+                pass  # loop already closed
+
+    def run(self):
+        asyncio.run(self._main())
+
+    def status(self):
+        return {task.name: {"state": task.state, "restarts": task.restarts, "error": task.error}
+                for task in self._tasks}
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        self._executor = ThreadPoolExecutor(self.max_workers or len(self._tasks) + 4,
+                                            thread_name_prefix=self.name)
+        if self.stop_event.is_set():
+            self._stopping.set()
+        for task in list(self._tasks):
+            self._running[task.name] = asyncio.create_task(self._supervise(task), name=task.name)
+        try:
+            await self._stopping.wait()
+        finally:
+            self.stop_event.set()
+            running = [future for future in self._running.values() if not future.done()]
+            pending = set()
+            if running:
+                done, pending = await asyncio.wait(running, timeout=self.shutdown_timeout)
+            for future in pending:
+                future.cancel()
+            if pending:
+                names = ", ".join(future.get_name() for future in pending)
+                logging.warning(f"{self.name}: tasks still running after {self.shutdown_timeout}s: {names}")
+                await asyncio.wait(pending, timeout=0.5)
+            # Do not wait for executor threads stuck in a blocking call
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._loop = None
+
+    async def _supervise(self, task):
+        loop = asyncio.get_running_loop()
+        while True:
+            task.state = "running"
+            started = loop.time()
+            try:
+                await task.run()
+            except asyncio.CancelledError:
+                task.state = "cancelled"
+                raise
+            except Exception as e:
+                task.error = str(e)
+                logging.error(f"{self.name}: task {task.name} failed: {e}")
+                if loop.time() - started >= RESET_AFTER:
+                    task.restarts = 0
+                if (task.restart and task.restarts < self.max_restarts
+                        and not self._stopping.is_set()):
+                    task.restarts += 1
+                    task.state = "restarting"
+                    counter("task_restarts_total", "Supervised tasks restarted after a failure",
+                            {"task": task.name}).inc()
+                    if not await self.wait(self.restart_delay * 2 ** (task.restarts - 1)):
+                        continue
+                task.state = "failed"
+            else:
+                task.state = "finished"
+            if task.critical:
+                self._stopping.set()
+            return
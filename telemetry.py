@@ -0,0 +1,277 @@
+import atexit
+import math
+import mmap
+import numpy as np
+import os
+import struct
+import sys
+import threading
+import time
+
+# Binary input telemetry
+# Keyboard and mouse events are stored as fixed-width 20-byte records after a
+# 24-byte header, appended through a memory-mapped file that grows in chunks:
+#
+#   header: magic "EXTL", version u16, record size u16, start time f64, count u64
+#   record: t_ms u32 (since start), type u8, button u8, code u16,
+#           x i32, y i32, dx i16, dy i16
+#
+# Mouse moves are downsampled: a move is kept only when at least
+# MOVE_MIN_INTERVAL seconds and MOVE_MIN_DISTANCE pixels separate it from the
+# last kept one. With endpoints_only, only the first and last point of each
+# movement segment (ended by a SEGMENT_GAP pause or any other event) are kept.
+
+MAGIC = b"EXTL"
+VERSION = 1
+HEADER = struct.Struct("<4sHHdQ")
+RECORD = struct.Struct("<IBBHiihh")
+COUNT_FIELD = struct.Struct("<Q")
+COUNT_OFFSET = HEADER.size - COUNT_FIELD.size
+GROW_BYTES = 1 << 20
+
+MOVE, PRESS, RELEASE, SCROLL, KEY, SPECIAL_KEY = range(1, 7)
+
+MOVE_MIN_INTERVAL = 0.05
+MOVE_MIN_DISTANCE = 5
+SEGMENT_GAP = 0.3
+
+BUTTONS = ["unknown", "left", "right", "middle"]
+SPECIAL_KEYS = [
+    "unknown", "alt", "alt_l", "alt_r", "alt_gr", "backspace", "caps_lock", "cmd", "cmd_l", "cmd_r",
+    "ctrl", "ctrl_l", "ctrl_r", "delete", "down", "end", "enter", "esc", "f1", "f2", "f3", "f4",
+    "f5", "f6", "f7", "f8", "f9", "f10", "f11", "f12", "home", "left", "page_down", "page_up",
+    "right", "shift", "shift_l", "shift_r", "space", "tab", "up", "insert", "menu", "num_lock",
+    "pause", "print_screen", "scroll_lock",
+]
+
+
+class InputRecorder:
+    def __init__(self, path, min_interval=MOVE_MIN_INTERVAL, min_distance=MOVE_MIN_DISTANCE,
+                 endpoints_only=False, segment_gap=SEGMENT_GAP):
+        self.path = path
+        self.min_interval = min_interval
+        self.min_distance = min_distance
+        self.endpoints_only = endpoints_only
+        self.segment_gap = segment_gap
+        self._lock = threading.Lock()
+        self._last_move = None      # (t, x, y) of the last kept move
+        self._pending_end = None    # (t, x, y) of the latest unsaved move in a segment
+        self.moves_seen = 0
+        self._open()
+
+    def _open(self):
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= HEADER.size:
+            with open(self.path, "rb") as file:
+                magic, version, size, start, count = HEADER.unpack(file.read(HEADER.size))
+            if magic != MAGIC or size != RECORD.size:
+                raise ValueError(f"{self.path} is not an input telemetry file")
+            self.start = start
+            self.count = count
+        else:
+            self.start = time.time()
+            self.count = 0
+            with open(self.path, "wb") as file:
+                file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, self.start, 0))
+        self._file = open(self.path, "r+b")
+        self._map = None
+        self._remap(HEADER.size + (self.count + 1) * RECORD.size)
+
+    def _remap(self, needed):
+        # The old map must be closed before resizing: Windows refuses to
+        # truncate a file that is still mapped
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        size = max(os.fstat(self._file.fileno()).st_size, HEADER.size)
+        if size < needed:
+            size = needed + GROW_BYTES - needed % GROW_BYTES
+            self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+    def _append(self, t, kind, x=0, y=0, button=0, code=0, dx=0, dy=0):
+        offset = HEADER.size + self.count * RECORD.size
+        if offset + RECORD.size > len(self._map):
+            self._remap(offset + RECORD.size)
+        t_ms = max(0, int((t - self.start) * 1000))
+        RECORD.pack_into(self._map, offset, t_ms, kind, button, code, int(x), int(y),
+                         _clamp16(dx), _clamp16(dy))
+        self.count += 1
+        # Keep the header count current so a crashed session stays readable
+        COUNT_FIELD.pack_into(self._map, COUNT_OFFSET, self.count)
+
+    def _end_segment(self):
+        if self._pending_end is not None:
+            self._append(self._pending_end[0], MOVE, self._pending_end[1], self._pending_end[2])
+            self._last_move = self._pending_end
+            self._pending_end = None
+
+    def move(self, x, y):
+        t = time.time()
+        with self._lock:
+            if self._map is None:
+                return
+            self.moves_seen += 1
+            last = self._last_move
+            if self.endpoints_only:
+                if self._pending_end is not None and t - self._pending_end[0] > self.segment_gap:
+                    self._end_segment()
+                    last = None
+                if self._pending_end is None and (last is None or t - last[0] > self.segment_gap):
+                    self._append(t, MOVE, x, y)
+                    self._last_move = (t, x, y)
+                else:
+                    self._pending_end = (t, x, y)
+                return
+            if last is not None:
+                if t - last[0] < self.min_interval:
+                    return
+                if math.hypot(x - last[1], y - last[2]) < self.min_distance:
+                    return
+            self._append(t, MOVE, x, y)
+            self._last_move = (t, x, y)
+
+    def click(self, x, y, button, pressed):
+        self._event(PRESS if pressed else RELEASE, x, y, button=_button_code(button))
+
+    def scroll(self, x, y, dx, dy):
+        self._event(SCROLL, x, y, dx=dx, dy=dy)
+
+    def key(self, key):
+        char = getattr(key, "char", None)
+        if char:
+            self._event(KEY, code=ord(char[0]) & 0xFFFF)
+        else:
+            self._event(SPECIAL_KEY, code=_special_key_code(key))
+
+    def _event(self, kind, x=0, y=0, **fields):
+        t = time.time()
+        with self._lock:
+            if self._map is None:
+                return
+            self._end_segment()
+            self._last_move = None
+            self._append(t, kind, x, y, **fields)
+
+    def flush(self):
+        with self._lock:
+            if self._map is None:
+                return
+            self._end_segment()
+            HEADER.pack_into(self._map, 0, MAGIC, VERSION, RECORD.size, self.start, self.count)
+            self._map.flush()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._map is None:
+                return
+            self._map.close()
+            self._map = None
+            # Drop the unused tail of the last growth chunk
+            self._file.truncate(HEADER.size + self.count * RECORD.size)
+            self._file.close()
+
+
+def _clamp16(value):
+    return max(-32768, min(32767, int(value)))
+
+
+def _button_code(button):
+    name = getattr(button, "name", str(button))
+    return BUTTONS.index(name) if name in BUTTONS else 0
+
+
+def _special_key_code(key):
+    name = getattr(key, "name", str(key))
+    return SPECIAL_KEYS.index(name) if name in SPECIAL_KEYS else 0
+
+
+_recorders = {}
+_recorders_lock = threading.Lock()
+
+
+def get_input_recorder(path="input_telemetry.bin", **options):
+    # One recorder per file, shared by every module that records input
+    with _recorders_lock:
+        recorder = _recorders.get(path)
+        if recorder is None:
+            recorder = InputRecorder(path, **options)
+            atexit.register(recorder.close)
+            _recorders[path] = recorder
+        return recorder
+
+
+def close_input_recorder(path):
+    with _recorders_lock:
+        recorder = _recorders.pop(path, None)
+    if recorder is not None:
+        recorder.close()
+        atexit.unregister(recorder.close)
+
+
+# Reading
+
+RECORD_DTYPE = np.dtype([("t_ms", "<u4"), ("type", "u1"), ("button", "u1"), ("code", "<u2"),
+                         ("x", "<i4"), ("y", "<i4"), ("dx", "<i2"), ("dy", "<i2")])
+
+
+def read_header(path):
+    with open(path, "rb") as file:
+        magic, version, size, start, count = HEADER.unpack(file.read(HEADER.size))
+    if magic != MAGIC or size != RECORD.size:
+        raise ValueError(f"{path} is not an input telemetry file")
+    return start, count
+
+
+def iter_telemetry(path, chunk_records=65536):
+    # Streams the file as structured NumPy arrays of at most chunk_records rows
+    start, count = read_header(path)
+    if count == 0:
+        return
+    records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER.size, shape=(count,))
+    for begin in range(0, count, chunk_records):
+        yield np.array(records[begin:begin + chunk_records])
+
+
+def load_telemetry(path):
+    # All records as one structured array plus the session start time (epoch seconds)
+    start, _ = read_header(path)
+    chunks = list(iter_telemetry(path))
+    records = np.concatenate(chunks) if chunks else np.empty(0, dtype=RECORD_DTYPE)
+    return records, start
+
+
+def format_record(record, start):
+    t_ms, kind, button, code, x, y, dx, dy = record
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start + t_ms / 1000.0))
+    if kind == MOVE:
+        text = f"Mouse moved to ({x}, {y})"
+    elif kind in (PRESS, RELEASE):
+        action = "Pressed" if kind == PRESS else "Released"
+        text = f"Mouse {action} Button.{BUTTONS[button]} at ({x}, {y})"
+    elif kind == SCROLL:
+        text = f"Mouse scroll at ({x}, {y}) by ({dx}, {dy})"
+    elif kind == KEY:
+        text = f"Key: {chr(code)}"
+    else:
+        name = SPECIAL_KEYS[code] if code < len(SPECIAL_KEYS) else "unknown"
+        text = f"Special Key: Key.{name}"
+    return f"[{stamp}] {text}"
+
+
+def telemetry_to_text(path, out_path):
+    # Converts a telemetry file to the activity_log.txt line format for auditors
+    start, count = read_header(path)
+    with open(path, "rb") as src, open(out_path, "w", encoding="utf-8") as out:
+        src.seek(HEADER.size)
+        for _ in range(count):
+            out.write(format_record(RECORD.unpack(src.read(RECORD.size)), start) + "\n")
+    return count
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python telemetry.py input_telemetry.bin activity_log.txt")
+        sys.exit(1)
+    written = telemetry_to_text(sys.argv[1], sys.argv[2])
+    print(f"Wrote {written} events to {sys.argv[2]}")
@@ -0,0 +1,73 @@
+from lazy import lazy_import
+
+cv2 = lazy_import("cv2")
+
+# Detect-then-track face localisation
+# The full-frame detector runs only every `detect_every` frames, or as soon as
+# one of the trackers loses its face; in between, each face is followed by a
+# lightweight OpenCV tracker. Results have the same (x, y, w, h) form as
+# CascadeClassifier.detectMultiScale, so callers keep their per-face logic.
+
+DETECT_EVERY = 10
+TRACKER_KIND = "KCF"
+
+
+def create_tracker(kind=TRACKER_KIND):
+    # KCF/CSRT live in opencv-contrib (cv2 or cv2.legacy depending on version);
+    # MIL ships with the main package and is the fallback
+    names = [f"Tracker{kind}_create", "TrackerMIL_create"]
+    for module in (cv2, getattr(cv2, "legacy", None)):
+        if module is None:
+            continue
+        for name in names:
+            factory = getattr(module, name, None)
+            if factory is not None:
+                return factory()
+    raise RuntimeError("No OpenCV tracker available")
+
+
+class FaceTracker:
+    def __init__(self, detect, detect_every=DETECT_EVERY, kind=TRACKER_KIND):
+        self.detect = detect
+        self.detect_every = detect_every
+        self.kind = kind
+        self._trackers = []
+        self._since_detect = 0
+        self.detections = 0
+        self.tracked_frames = 0
+
+    def update(self, frame, gray):
+        if not self._trackers or self._since_detect >= self.detect_every:
+            return self._redetect(frame, gray)
+
+        faces = []
+        for tracker in self._trackers:
+            ok, box = tracker.update(frame)
+            if not ok or not _inside(box, frame.shape):
+                # Tracking confidence dropped; fall back to a full detection
+                return self._redetect(frame, gray)
+            faces.append(tuple(int(v) for v in box))
+        self._since_detect += 1
+        self.tracked_frames += 1
+        return faces
+
+    def _redetect(self, frame, gray):
+        faces = [tuple(int(v) for v in face) for face in self.detect(gray)]
+        self._trackers = []
+        for face in faces:
+            tracker = create_tracker(self.kind)
+            tracker.init(frame, face)
+            self._trackers.append(tracker)
+        self._since_detect = 1
+        self.detections += 1
+        return faces
+
+    def reset(self):
+        self._trackers = []
+        self._since_detect = 0
+
+
+def _inside(box, shape):
+    x, y, w, h = box
+    height, width = shape[:2]
+    return w > 0 and h > 0 and x >= 0 and y >= 0 and x + w <= width and y + h <= height
@@ -0,0 +1,79 @@
+import queue
+import time
+
+# Monitoring -> Tk bridge
+# Tk widgets may only be touched from the thread running mainloop(). The
+# monitoring threads therefore publish small status dicts into a bounded
+# queue (the oldest is dropped when it is full, publish() never blocks), and
+# the Tk side drains it with after() every REFRESH_MS, showing only the newest
+# snapshot. Publishers are also rate limited to PUBLISH_INTERVAL so the video
+# loop does not build a dict per frame for a UI that refreshes 5 times a second.
+
+QUEUE_SIZE = 8
+REFRESH_MS = 200
+PUBLISH_INTERVAL = 0.2
+
+
+class StatusBridge:
+    def __init__(self, queue_size=QUEUE_SIZE, publish_interval=PUBLISH_INTERVAL):
+        self.publish_interval = publish_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._last_publish = 0.0
+        self._after_id = None
+        self._widget = None
+        self.dropped = 0
+        self.latest = {}
+
+    def due(self):
+        # Cheap check so publishers can skip building a status that would be dropped
+        return time.monotonic() - self._last_publish >= self.publish_interval
+
+    def publish(self, status, force=False):
+        # Any thread; force=True bypasses the rate limit (state changes)
+        if not force and not self.due():
+            return False
+        self._last_publish = time.monotonic()
+        while True:
+            try:
+                self._queue.put_nowait(status)
+                return True
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def drain(self):
+        # Newest status merged over the previous one, or None if nothing new
+        updated = False
+        while True:
+            try:
+                status = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self.latest = {**self.latest, **status}
+            updated = True
+        return self.latest if updated else None
+
+    def attach(self, widget, callback, interval_ms=REFRESH_MS):
+        # Tk thread only: call callback(status) from widget.after() when there is news
+        self.detach()
+        self._widget = widget
+
+        def poll():
+            status = self.drain()
+            if status is not None:
+                try:
+                    callback(status)
+                except Exception as e:
+                    print(f"Status update error: {e}")
+            self._after_id = widget.after(interval_ms, poll)
+
+        self._after_id = widget.after(interval_ms, poll)
+
+    def detach(self):
+        if self._widget is not None and self._after_id is not None:
+            self._widget.after_cancel(self._after_id)
+        self._widget = None
+        self._after_id = None
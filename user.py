@@ -1,21 +1,33 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import threading
-from basemodel import run_the_back
+from basemodel import warm_up, start_metrics
+from session import MonitoringSession
+from uibridge import StatusBridge
 import logging
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-monitoring_thread = None
+monitoring_session = None
+# Monitoring threads publish status here; the Tk loop drains it (see uibridge.py)
+status_bridge = StatusBridge()
+live_labels = []
 
-def start_quiz_window(title):
-    global monitoring_thread
+def start_monitoring():
+    # Every start gets a fresh session (own stop flag and output directory)
+    global monitoring_session
+    start_metrics()
+    monitoring_session = MonitoringSession(status_bridge=status_bridge).start()
+
+def stop_monitoring():
+    if monitoring_session is not None:
+        monitoring_session.stop()
+        monitoring_session.join(timeout=10)
 
+def start_quiz_window(title):
     # Start monitoring system if not running
-    if monitoring_thread is None or not monitoring_thread.is_alive():
+    if monitoring_session is None or not monitoring_session.is_alive():
         logging.info("Starting monitoring system...")
-        monitoring_thread = threading.Thread(target=run_the_back, daemon=True)
-        monitoring_thread.start()
+        start_monitoring()
         logging.info("Monitoring system started.")
     else:
         logging.info("Monitoring system already running.")
@@ -37,6 +49,9 @@ def start_quiz_window(title):
              bg="#ffeb3b", font=("Arial", 10, "bold"), fg="red").pack(pady=5)
     tk.Label(warning_frame, text="All activities and movements will be recorded", 
              bg="#ffeb3b", font=("Arial", 9)).pack(pady=2)
+    live_label = tk.Label(warning_frame, text="Waiting for camera...", bg="#ffeb3b", font=("Arial", 9))
+    live_label.pack(pady=2)
+    live_labels.append(live_label)
 
     # Question section
     question_frame = tk.LabelFrame(quiz_window, text="Question 1", font=("Arial", 12, "bold"))
@@ -178,27 +193,30 @@ system_frame.pack(anchor="w", pady=5)
 tk.Label(system_frame, text="System:", font=("Arial", 10)).pack(side="left")
 tk.Label(system_frame, text="Ready", fg="green", font=("Arial", 10, "bold")).pack(side="left", padx=5)
 
-def update_status():
-    global monitoring_thread
-    try:
-        if monitoring_thread and monitoring_thread.is_alive():
-            status_label.config(text="Active - Monitoring", fg="green")
-        else:
-            status_label.config(text="Inactive", fg="red")
-    except Exception as e:
+def update_status(status):
+    # Runs on the Tk thread (StatusBridge.attach); never call it from monitoring threads
+    if status.get("state") in ("starting", "running"):
+        status_label.config(text="Active - Monitoring", fg="green")
+    elif status.get("state") == "failed":
         status_label.config(text="Error", fg="orange")
-        print(f"Status update error: {e}")
-    root.after(2000, update_status)
+    else:
+        status_label.config(text="Inactive", fg="red")
+    if "faces" in status:
+        text = (f"Faces: {status['faces']} | Eyes: {status['eyes']} | Away: {status['away']} | "
+                f"Audio: {'Yes' if status['audio'] else 'No'} | {status['fps']:.0f} fps | Risk: {status['risk']:.0f}")
+        for label in list(live_labels):
+            if label.winfo_exists():
+                label.config(text=text)
+            else:
+                live_labels.remove(label)
 
 # Control buttons
 control_frame = tk.Frame(root)
 control_frame.pack(pady=15)
 
 def start_monitoring_manually():
-    global monitoring_thread
-    if monitoring_thread is None or not monitoring_thread.is_alive():
-        monitoring_thread = threading.Thread(target=run_the_back, daemon=True)
-        monitoring_thread.start()
+    if monitoring_session is None or not monitoring_session.is_alive():
+        start_monitoring()
         messagebox.showinfo("Info", "Monitoring system started manually")
     else:
         messagebox.showinfo("Warning", "Monitoring system is already running")
@@ -234,7 +252,11 @@ Phone: 123-456-7890
 
 ttk.Button(control_frame, text="Start Monitoring Manually", command=start_monitoring_manually).pack(side="left", padx=5)
 ttk.Button(control_frame, text="Help", command=show_help).pack(side="left", padx=5)
-ttk.Button(control_frame, text="Logout", command=root.quit).pack(side="left", padx=5)
+def logout():
+    stop_monitoring()
+    root.quit()
+
+ttk.Button(control_frame, text="Logout", command=logout).pack(side="left", padx=5)
 
 # Footer
 footer_frame = tk.Frame(root, bg="#f5f5f5", height=30)
@@ -243,5 +265,7 @@ footer_frame.pack_propagate(False)
 tk.Label(footer_frame, text="© 2024 University - All rights reserved", font=("Arial", 8), bg="#f5f5f5").pack(pady=5)
 
 # Start status updates
-update_status()
+status_bridge.attach(root, update_status)
+# Load camera/input dependencies in the background while the window is shown
+warm_up()
 root.mainloop()
@@ -0,0 +1,259 @@
+import logging
+import multiprocessing as mp
+import os
+import queue
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from camera import open_frame_source, close_frame_source
+from detectors import create_detector
+
+# Process-pool detection backend
+# Each camera stream owns a shared-memory ring of frame slots. submit() copies a
+# frame into a free slot and queues only (stream, slot, seq) for the workers,
+# so frames are never pickled. Every worker process creates the detectors of
+# `kinds` (see detectors.py) and loads their models once at start-up; other
+# kinds are created on their first task. Workers attach to each stream's
+# shared memory on first use.
+# remove_stream() tells every worker, through its own control queue, to close
+# its mapping of the stream, so the segment is freed while the pool keeps running.
+# A collector thread in the parent frees the slots again and keeps the latest
+# result per camera, optionally forwarding each one to an on_result callback.
+# A worker that dies mid-task never returns its slot, so dead workers are
+# restarted and the in-flight slots freed; late results of those tasks no
+# longer match the slot's pending seq and are dropped.
+
+DEFAULT_SLOTS = 4
+CONTROL_INTERVAL = 1.0  # seconds an idle worker waits before checking its control queue
+
+
+def _detach(attached, control):
+    while True:
+        try:
+            shm_name = control.get_nowait()
+        except queue.Empty:
+            return
+        entry = attached.pop(shm_name, None)
+        if entry is not None:
+            entry[0].close()
+
+
+def _worker_main(kinds, tasks, results, control):
+    detectors = {kind: create_detector(kind) for kind in kinds}
+    for detector in detectors.values():
+        detector.warm_up()
+    attached = {}
+    while True:
+        _detach(attached, control)
+        try:
+            task = tasks.get(timeout=CONTROL_INTERVAL)
+        except queue.Empty:
+            continue
+        if task is None:
+            break
+        camera_id, shm_name, shape, slot, seq, timestamp, kind = task
+        try:
+            if shm_name not in attached:
+                shm = shared_memory.SharedMemory(name=shm_name)
+                attached[shm_name] = (shm, np.ndarray(shape, dtype=np.uint8, buffer=shm.buf))
+        except FileNotFoundError:
+            # The stream was removed while this task was queued
+            results.put((camera_id, slot, seq, timestamp, {"error": "stream removed"}))
+            continue
+        frame = attached[shm_name][1][slot]
+        try:
+            if kind not in detectors:
+                detectors[kind] = create_detector(kind)
+            result = detectors[kind].detect([frame])[0]
+        except Exception as e:
+            result = {"error": str(e)}
+        results.put((camera_id, slot, seq, timestamp, result))
+    for shm, _ in attached.values():
+        shm.close()
+
+
+class _Stream:
+    def __init__(self, camera_id, frame_shape, slots):
+        self.camera_id = camera_id
+        self.shape = (slots,) + tuple(frame_shape)
+        self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(self.shape)))
+        self.frames = np.ndarray(self.shape, dtype=np.uint8, buffer=self.shm.buf)
+        self.pending = [None] * slots  # seq of the task using each slot, None when free
+        self.seq = 0
+        self.latest = None
+        self.dropped = 0
+
+
+class DetectionPool:
+    def __init__(self, kinds=("haar",), workers=None, slots=DEFAULT_SLOTS, on_result=None):
+        self.kinds = tuple(kinds)
+        self.slots = slots
+        self.on_result = on_result
+        self._streams = {}
+        self._lock = threading.Lock()
+        self._tasks = mp.Queue()
+        self._results = mp.Queue()
+        self._closing = False
+        count = workers or max(1, (os.cpu_count() or 2) - 1)
+        self._controls = [mp.Queue() for _ in range(count)]
+        self._workers = [self._spawn(i) for i in range(count)]
+        self._collector = threading.Thread(target=self._collect, name="detector-results", daemon=True)
+        self._collector.start()
+
+    def _spawn(self, i):
+        worker = mp.Process(target=_worker_main, args=(self.kinds, self._tasks, self._results, self._controls[i]),
+                            name=f"detector-{i}", daemon=True)
+        worker.start()
+        return worker
+
+    def _reap_workers(self):
+        # Caller holds _lock. Restarts dead workers and frees every in-flight
+        # slot, since the task queue does not say which worker had which slot.
+        dead = [i for i, worker in enumerate(self._workers) if not worker.is_alive()]
+        if not dead or self._closing:
+            return False
+        for i in dead:
+            worker = self._workers[i]
+            logging.error(f"Detection worker {worker.name} died (exit code {worker.exitcode}); restarting it")
+            self._workers[i] = self._spawn(i)
+        for stream in self._streams.values():
+            stream.pending = [None] * len(stream.pending)
+        return True
+
+    def add_stream(self, camera_id, frame_shape):
+        with self._lock:
+            if camera_id not in self._streams:
+                self._streams[camera_id] = _Stream(camera_id, frame_shape, self.slots)
+
+    def remove_stream(self, camera_id, timeout=5):
+        # Waits for frames still in the workers before freeing the shared memory
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                stream = self._streams.get(camera_id)
+                if stream is None or all(seq is None for seq in stream.pending):
+                    break
+                self._reap_workers()
+            time.sleep(0.05)
+        with self._lock:
+            stream = self._streams.pop(camera_id, None)
+        if stream is not None:
+            for control in self._controls:
+                control.put(stream.shm.name)
+            stream.shm.close()
+            stream.shm.unlink()
+
+    def submit(self, camera_id, frame, timestamp=0.0, kind="haar"):
+        # False when every slot of this stream is still being processed (frame dropped)
+        with self._lock:
+            stream = self._streams[camera_id]
+            if frame.shape != stream.shape[1:]:
+                raise ValueError(f"Frame shape {frame.shape} does not match stream {stream.shape[1:]}")
+            if None not in stream.pending and not self._reap_workers():
+                stream.dropped += 1
+                return False
+            slot = stream.pending.index(None)
+            stream.seq += 1
+            stream.pending[slot] = stream.seq
+            # Copied and queued under the lock, so remove_stream cannot free
+            # the segment in between
+            stream.frames[slot] = frame
+            self._tasks.put((camera_id, stream.shm.name, stream.shape, slot, stream.seq, timestamp, kind))
+        return True
+
+    def _collect(self):
+        while True:
+            try:
+                item = self._results.get(timeout=CONTROL_INTERVAL)
+            except queue.Empty:
+                with self._lock:
+                    self._reap_workers()
+                continue
+            if item is None:
+                break
+            camera_id, slot, seq, timestamp, result = item
+            with self._lock:
+                stream = self._streams.get(camera_id)
+                if stream is None or stream.pending[slot] != seq:
+                    continue
+                stream.pending[slot] = None
+                # Workers finish out of order; keep only the newest result
+                if stream.latest is None or seq > stream.latest[0]:
+                    stream.latest = (seq, timestamp, result)
+            if self.on_result is not None:
+                self.on_result(camera_id, seq, timestamp, result)
+
+    def latest(self, camera_id):
+        # (seq, timestamp, result) of the newest finished frame, or None
+        with self._lock:
+            stream = self._streams.get(camera_id)
+            return stream.latest if stream is not None else None
+
+    def close(self):
+        with self._lock:
+            self._closing = True
+        for _ in self._workers:
+            self._tasks.put(None)
+        for worker in self._workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        self._results.put(None)
+        self._collector.join(timeout=5)
+        with self._lock:
+            for stream in self._streams.values():
+                stream.shm.close()
+                stream.shm.unlink()
+            self._streams.clear()
+
+
+def _feed_camera(pool, index, kind, stop_event):
+    source = open_frame_source(index)
+    if source is None:
+        logging.error(f"Cannot open camera {index}")
+        return
+    last_seq = -1
+    try:
+        while not stop_event.is_set() and source.is_running():
+            ref = source.acquire(after_seq=last_seq)
+            if ref is None:
+                continue
+            last_seq = ref.seq
+            with ref:
+                pool.add_stream(index, ref.frame.shape)
+                pool.submit(index, ref.frame, ref.timestamp, kind)
+    finally:
+        close_frame_source(source)
+
+
+def monitor_cameras(indices, kind="haar", on_result=None, stop_event=None, workers=None):
+    # Runs detection for several cameras on one pool until stop_event is set
+    stop_event = stop_event or threading.Event()
+    pool = DetectionPool((kind,), workers=workers, on_result=on_result)
+    feeders = [threading.Thread(target=_feed_camera, args=(pool, index, kind, stop_event), daemon=True)
+               for index in indices]
+    for feeder in feeders:
+        feeder.start()
+    try:
+        for feeder in feeders:
+            while feeder.is_alive():
+                feeder.join(timeout=0.5)
+    except KeyboardInterrupt:
+        stop_event.set()
+    finally:
+        stop_event.set()
+        pool.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    cameras = [int(arg) for arg in sys.argv[1:]] or [0]
+
+    def show(camera_id, seq, timestamp, result):
+        logging.info(f"camera {camera_id} frame {seq}: {len(result.get('faces', []))} faces")
+
+    monitor_cameras(cameras, on_result=show)